@@ -0,0 +1,90 @@
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pyarrow as pa
+import export
+import main
+
+# Requests /api/top-traders/export in both formats through app.test_client(), with the
+# database swapped for an in-memory top_traders table, and checks the streamed bodies
+# hold every matching row once. The body is written after the view returns, so this
+# catches anything in the stream that needs the app context.
+#
+# Usage: python check_export.py
+
+PERIODS = ['30d', '7d', '3d', '1d']
+TOKENS = 40
+SINCE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def key(row):
+    return (row.tokenAddress, row.period, row.rank)
+
+class FakeTopTraderActions:
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=key)
+
+    async def find_many(self, where, order, take, cursor=None, skip=0):
+        rows = [
+            row for row in self.rows
+            if ('period' not in where or row.period == where['period'])
+            and ('updatedAt' not in where or row.updatedAt >= where['updatedAt']['gte'])
+        ]
+        if cursor:
+            last = cursor['tokenAddress_period_rank']
+            rows = [row for row in rows if key(row) >= (last['tokenAddress'], last['period'], last['rank'])]
+        return rows[skip:skip + take]
+
+def fake_rows():
+    rows = []
+    for t in range(TOKENS):
+        for p, period in enumerate(PERIODS):
+            for rank in range(1, 31):
+                updated = SINCE + timedelta(days=(t + rank) % 3 - 1)
+                rows.append(SimpleNamespace(
+                    tokenAddress=f'token{t}', period=period, rank=rank, wallet=f'wallet{(t * 31 + rank) % 500}',
+                    boughtAmount=float(rank), boughtVolume=float(t), soldAmount=float(rank * 2), soldVolume=float(p),
+                    pnl=float(rank - t), unrealized='', balance='', transactions='1/1',
+                    createdAt=SINCE - timedelta(days=1), updatedAt=updated
+                ))
+    return rows
+
+async def run():
+    rows = fake_rows()
+    main.prisma = SimpleNamespace(toptrader=FakeTopTraderActions(rows))
+    export.EXPORT_PAGE_SIZE = 97
+    client = main.app.test_client()
+    failures = []
+
+    cases = [
+        ({}, rows),
+        ({'period': '7d'}, [row for row in rows if row.period == '7d']),
+        ({'period': '30d', 'updated_since': SINCE.isoformat()},
+         [row for row in rows if row.period == '30d' and row.updatedAt >= SINCE]),
+    ]
+    for args, matching in cases:
+        expected = sorted(key(row) for row in matching)
+
+        response = await client.get('/api/top-traders/export', query_string={**args, 'format': 'ndjson'})
+        body = await response.get_data()
+        lines = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        got = [(line['tokenAddress'], line['period'], line['rank']) for line in lines]
+        if response.status_code != 200 or got != expected:
+            failures.append(f'ndjson {args}: {response.status_code}, {len(got)} rows, expected {len(expected)}')
+
+        response = await client.get('/api/top-traders/export', query_string={**args, 'format': 'arrow'})
+        body = await response.get_data()
+        table = pa.ipc.open_stream(body).read_all() if response.status_code == 200 else None
+        got = list(zip(*(table.column(c).to_pylist() for c in ('tokenAddress', 'period', 'rank')))) if table else []
+        if response.status_code != 200 or got != expected:
+            failures.append(f'arrow {args}: {response.status_code}, {len(got)} rows, expected {len(expected)}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if not failures:
+        print(f'ok   exported {len(cases)} filters in ndjson and arrow')
+    return len(failures)
+
+if __name__ == '__main__':
+    sys.exit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import random
+import sys
+from db_session import connect_db, closing_db
+from rollups import rebuild_trader_rollups, rollup_refresh_select
+from main import TOKEN_TOP_TRADERS_QUERY, TOP_TRADERS_QUERY
+
+# Runs EXPLAIN on the SQL the token and top trader endpoints and the rollup refresh send, and
+# exits non-zero when a query reads a table with a full scan or sorts with a filesort.
+# On near-empty tables MySQL prefers scans regardless of indexes, so run it against a
+# populated database or pass --seed to insert synthetic rows (removed again afterwards).
+#
+# Usage: python check_query_plans.py [--seed]
+
+SEED_PREFIX = 'plancheck'
+PERIODS = ['30d', '7d', '3d', '1d']
+CHUNK_SIZE = 500
+
+# (endpoint, SQL the endpoint sends, args); the /api/tokens SQL matches the Prisma queries
+QUERIES = [
+    ('/api/top-traders/<token_address>', TOKEN_TOP_TRADERS_QUERY, ['30d', f'{SEED_PREFIX}1', 10]),
+    ('/api/top-traders', TOP_TRADERS_QUERY.format(order_by='total_pnl'), ['30d', 1.5, 10]),
+    ('/api/tokens',
+     "SELECT * FROM tokens ORDER BY createdAt DESC, address DESC LIMIT 50", []),
+    ('/api/tokens?sort=liquidity&min_liquidity=',
+     "SELECT * FROM tokens WHERE liquidity_usd >= ? ORDER BY liquidity_usd DESC, address DESC LIMIT 50", [1e5]),
+    ('/api/tokens?sort=volume (next page)',
+     "SELECT * FROM tokens WHERE volume_usd IS NOT NULL AND (volume_usd < ? OR (volume_usd = ? AND address < ?)) "
+     "ORDER BY volume_usd DESC, address DESC LIMIT 50", [1e5, 1e5, f'{SEED_PREFIX}500']),
+    ('/api/tokens?sort=mcap',
+     "SELECT * FROM tokens WHERE mcap_usd IS NOT NULL ORDER BY mcap_usd DESC, address DESC LIMIT 50", []),
+    ('rollup refresh after a scrape', rollup_refresh_select(2),
+     [f'{SEED_PREFIX}wallet1', '30d', f'{SEED_PREFIX}wallet2', '7d']),
+]
+
+def plan_problems(plan):
+    problems = []
+    for step in plan:
+        extra = step.get('Extra') or ''
+        if step.get('type') == 'ALL':
+            problems.append(f"full scan of {step['table']}")
+        if 'Using filesort' in extra:
+            problems.append(f"filesort on {step['table']}")
+    return problems
+
+async def seed(db, tokens, wallets):
+    rng = random.Random(42)
+    rows = [
+        [f'{SEED_PREFIX}{t}', period, rank, f'{SEED_PREFIX}wallet{rng.randrange(wallets)}',
+         rng.uniform(0, 1e6), rng.uniform(0, 1e5), rng.uniform(0, 1e6), rng.uniform(0, 1e5),
+         rng.uniform(-1e4, 1e5), '', '', '']
+        for t in range(tokens) for period in PERIODS for rank in range(1, 31)
+    ]
+    placeholder = '(' + ', '.join(['?'] * 12) + ', UTC_TIMESTAMP(3), UTC_TIMESTAMP(3))'
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        await db.execute_raw(
+            "INSERT IGNORE INTO top_traders (tokenAddress, period, `rank`, wallet, boughtAmount, boughtVolume, "
+            "soldAmount, soldVolume, pnl, unrealized, balance, transactions, createdAt, updatedAt) VALUES "
+            + ', '.join([placeholder] * len(chunk)),
+            *[value for row in chunk for value in row]
+        )
+    await rebuild_trader_rollups(db)
+    token_rows = [
+        [f'{SEED_PREFIX}{t}', f'{SEED_PREFIX}{t}', rng.uniform(0, 1e6), rng.uniform(0, 1e7), rng.uniform(0, 1e8)]
+        for t in range(tokens)
+    ]
+    for i in range(0, len(token_rows), CHUNK_SIZE):
+        chunk = token_rows[i:i + CHUNK_SIZE]
+        await db.execute_raw(
+            "INSERT IGNORE INTO tokens (address, token, liquidity_usd, volume_usd, mcap_usd, createdAt, updatedAt) VALUES "
+            + ', '.join(['(?, ?, ?, ?, ?, UTC_TIMESTAMP(3), UTC_TIMESTAMP(3))'] * len(chunk)),
+            *[value for row in chunk for value in row]
+        )
+    print(f"Seeded {len(rows)} top_traders rows and {len(token_rows)} tokens")
+
+async def unseed(db):
+    await db.execute_raw("DELETE FROM top_traders WHERE tokenAddress LIKE ?", f'{SEED_PREFIX}%')
+    await db.execute_raw("DELETE FROM tokens WHERE address LIKE ?", f'{SEED_PREFIX}%')
+    await rebuild_trader_rollups(db)
+
+async def check_plans(db):
+    await db.query_raw("ANALYZE TABLE tokens, top_traders, top_trader_rollups")
+    failures = 0
+    for endpoint, sql, args in QUERIES:
+        plan = await db.query_raw(f"EXPLAIN {sql}", *args)
+        problems = plan_problems(plan)
+        keys = ', '.join(str(step.get('key')) for step in plan)
+        print(f"{'FAIL' if problems else 'ok':<5} {endpoint:<40} key: {keys}  {'; '.join(problems)}")
+        failures += bool(problems)
+    return failures
+
+async def run(args):
+    db = await connect_db()
+    if not args.seed:
+        return await check_plans(db)
+    await seed(db, args.tokens, args.wallets)
+    try:
+        return await check_plans(db)
+    finally:
+        await unseed(db)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', action='store_true', help='insert synthetic tokens and top_traders rows for the check')
+    parser.add_argument('--tokens', type=int, default=300)
+    parser.add_argument('--wallets', type=int, default=5000)
+    args = parser.parse_args()
+    failures = asyncio.run(closing_db(run(args)))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from functools import wraps
+from quart import request, make_response, Response
+from db_session import get_db
+import os
+import time
+
+DATA_VERSION_TTL = float(os.getenv('DATA_VERSION_TTL', 5))  # seconds between reads of the stored version
+
+_versions = {}  # name -> (checked_at, version, updated_at)
+
+async def get_data_version(db, name):
+    # Scrapes can run in another process, so the stored version is re-read at most
+    # every DATA_VERSION_TTL seconds instead of on every request
+    cached = _versions.get(name)
+    if cached and time.monotonic() - cached[0] < DATA_VERSION_TTL:
+        return cached[1], cached[2]
+    row = await db.dataversion.find_unique(where={'name': name})
+    version, updated_at = (row.version, row.updatedAt) if row else (0, None)
+    _versions[name] = (time.monotonic(), version, updated_at)
+    return version, updated_at
+
+async def bump_data_version(db, name):
+    await db.execute_raw(
+        "INSERT INTO data_versions (name, version, updatedAt) VALUES (?, 1, UTC_TIMESTAMP(3)) "
+        "ON DUPLICATE KEY UPDATE version = version + 1, updatedAt = UTC_TIMESTAMP(3)",
+        name
+    )
+    _versions.pop(name, None)
+
+def not_modified(etag, updated_at):
+    # If-None-Match wins over If-Modified-Since when a client sends both. The date only has
+    # second precision, so it matches while the last change falls in or before that second;
+    # versions are bumped once per scrape, which keeps two changes out of the same second
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and updated_at:
+        return updated_at < request.if_modified_since + timedelta(seconds=1)
+    return False
+
+def versioned_response(name):
+    # Tags successful responses with the data version and answers conditional
+    # requests for an unchanged version with 304 before the view runs
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            version, updated_at = await get_data_version(get_db(), name)
+            etag = f'{name}-{version}'
+            if not_modified(etag, updated_at):
+                response = Response(status=304)
+            else:
+                response = await make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if updated_at:
+                response.last_modified = updated_at
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,75 @@
+import io
+import os
+import pyarrow as pa
+from metrics import observe_db
+
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 5000))
+
+EXPORT_ORDER = [{'tokenAddress': 'asc'}, {'period': 'asc'}, {'rank': 'asc'}]
+
+EXPORT_SCHEMA = pa.schema([
+    ('tokenAddress', pa.string()),
+    ('period', pa.string()),
+    ('rank', pa.int32()),
+    ('wallet', pa.string()),
+    ('boughtAmount', pa.float64()),
+    ('boughtVolume', pa.float64()),
+    ('soldAmount', pa.float64()),
+    ('soldVolume', pa.float64()),
+    ('pnl', pa.float64()),
+    ('unrealized', pa.string()),
+    ('balance', pa.string()),
+    ('transactions', pa.string()),
+    ('createdAt', pa.timestamp('ms', tz='UTC')),
+    ('updatedAt', pa.timestamp('ms', tz='UTC')),
+])
+
+def export_where(period=None, updated_since=None):
+    where = {}
+    if period:
+        where['period'] = period
+    if updated_since:
+        where['updatedAt'] = {'gte': updated_since}
+    return where
+
+async def export_pages(db, where):
+    # Walks top_traders in primary key order one page at a time, continuing after the
+    # last key read, so only a single page is held in memory however large the export
+    last = None
+    while True:
+        with observe_db('find_many', 'toptrader'):
+            rows = await db.toptrader.find_many(
+                where=where,
+                order=EXPORT_ORDER,
+                take=EXPORT_PAGE_SIZE,
+                **({
+                    'cursor': {'tokenAddress_period_rank': last},
+                    'skip': 1
+                } if last else {})
+            )
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            break
+        last = {'tokenAddress': rows[-1].tokenAddress, 'period': rows[-1].period, 'rank': rows[-1].rank}
+
+def export_row(row):
+    return {field: getattr(row, field) for field in EXPORT_SCHEMA.names}
+
+async def stream_ndjson(db, where, dumps):
+    # Runs after the view returns, outside the app context, so dumps is bound by the caller
+    async for rows in export_pages(db, where):
+        yield ''.join(dumps(export_row(row)) + '\n' for row in rows).encode('utf-8')
+
+async def stream_arrow(db, where, dumps=None):
+    # One record batch per page in the Arrow IPC streaming format; the buffer is
+    # drained after every batch so it never holds more than one page either
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, EXPORT_SCHEMA)
+    async for rows in export_pages(db, where):
+        writer.write_batch(pa.RecordBatch.from_pylist([export_row(row) for row in rows], schema=EXPORT_SCHEMA))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
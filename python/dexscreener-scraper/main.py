@@ -1,24 +1,36 @@
-from quart import Quart, request, jsonify
-from prisma import Prisma
+from quart import Quart, request, jsonify, Response, current_app
 import asyncio
+import base64
+import json
 import logging
-from toptraders import scrape_top_traders
+import math
+from datetime import datetime, timezone
 from quart_cors import cors
+from metrics import init_metrics, observe_db
+from db_session import get_db, connect_db, disconnect_db
+from rollups import ensure_trader_rollups
+from data_version import versioned_response
+from export import export_where, stream_ndjson, stream_arrow
+from scrape_jobs import jobs, submit_scrape, job_view, job_events, start_scrape_worker, stop_scrape_worker
 
 app = Quart(__name__)
 app = cors(app)
-prisma = Prisma()
+init_metrics(app)
+prisma = get_db()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @app.before_serving
 async def startup():
-    await prisma.connect()
+    await connect_db()
+    await ensure_trader_rollups(prisma)
+    start_scrape_worker()
 
 @app.after_serving
 async def shutdown():
-    await prisma.disconnect()
+    await stop_scrape_worker()
+    await disconnect_db()
 
 @app.before_request
 async def log_request_info():
@@ -29,20 +41,107 @@ async def log_request_info():
 
 @app.route('/api/scrape', methods=['POST'])
 async def trigger_scrape():
-    try:
-        await scrape_top_traders()
-        return {'status': 'success', 'message': 'Scraping completed'}, 200
-    except Exception as e:
-        return {'status': 'error', 'message': str(e)}, 500
+    # Queues a scrape of every token, or of the addresses in {"tokens": [...]}, and returns
+    # at once; a scope with a job already queued or running gets that job back
+    data = await request.get_json(silent=True) or {}
+    addresses = data.get('tokens')
+    if addresses is not None and (not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses)):
+        return jsonify({'error': 'tokens must be a list of token addresses'}), 400
+
+    job, created = submit_scrape(addresses)
+    return {'status': job['status'], 'job_id': job['id'], 'job': job_view(job)}, 202 if created else 200
+
+@app.route('/api/scrape/<job_id>', methods=['GET'])
+async def get_scrape_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Scrape job not found'}), 404
+    return job_view(job)
+
+@app.route('/api/scrape/<job_id>/events', methods=['GET'])
+async def stream_scrape_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Scrape job not found'}), 404
+    response = Response(job_events(job), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.timeout = None
+    return response
+
+TOKEN_SORTS = {
+    'created': 'createdAt',
+    'liquidity': 'liquidityUsd',
+    'volume': 'volumeUsd',
+    'mcap': 'mcapUsd'
+}
+TOKEN_MIN_FILTERS = {
+    'min_liquidity': 'liquidityUsd',
+    'min_volume': 'volumeUsd',
+    'min_mcap': 'mcapUsd'
+}
+MAX_TOKENS_LIMIT = 500
+
+def encode_token_cursor(value, address):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, address]).encode('utf-8')).decode('ascii')
+
+def decode_token_cursor(cursor, sort_field):
+    value, address = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if sort_field == 'createdAt':
+        value = datetime.fromisoformat(value)
+    return value, str(address)
 
 @app.route('/api/tokens', methods=['GET'])
 async def get_tokens():
-    tokens = await prisma.token.find_many(
-        order={
-            'createdAt': 'desc'
-        }
-    )
-    return {'tokens': tokens}
+    # Filters and sorts on the numeric columns parsed at ingest; limit/cursor page through
+    # the results by (sort column, address), newest or largest first
+    sort = request.args.get('sort', 'created')
+    if sort not in TOKEN_SORTS:
+        return jsonify({'error': f"Invalid sort. Must be one of: {', '.join(TOKEN_SORTS)}"}), 400
+    sort_field = TOKEN_SORTS[sort]
+
+    where = {}
+    try:
+        for arg, field in TOKEN_MIN_FILTERS.items():
+            if request.args.get(arg) is not None:
+                value = float(request.args[arg])
+                if not math.isfinite(value):
+                    raise ValueError
+                where[field] = {'gte': value}
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = min(int(limit), MAX_TOKENS_LIMIT)
+            if limit < 1:
+                raise ValueError
+    except ValueError:
+        return jsonify({'error': 'min_liquidity, min_volume, min_mcap and limit must be numbers, limit positive'}), 400
+    if sort_field != 'createdAt' and sort_field not in where:
+        # Tokens without a parsed value cannot be placed in the order, so they are left out
+        where[sort_field] = {'not': None}
+
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            value, address = decode_token_cursor(cursor, sort_field)
+        except Exception:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        where['OR'] = [
+            {sort_field: {'lt': value}},
+            {sort_field: value, 'address': {'lt': address}}
+        ]
+
+    with observe_db('find_many', 'token'):
+        tokens = await prisma.token.find_many(
+            where=where,
+            order=[{sort_field: 'desc'}, {'address': 'desc'}],
+            take=limit
+        )
+
+    next_cursor = None
+    if limit and len(tokens) == limit:
+        next_cursor = encode_token_cursor(getattr(tokens[-1], sort_field), tokens[-1].address)
+    return {'tokens': tokens, 'next_cursor': next_cursor}
 
 @app.route('/api/tokens', methods=['POST'])
 async def add_token():
@@ -71,7 +170,80 @@ async def delete_token(token_id):
     except Exception:
         return jsonify({'error': 'Token not found'}), 404
 
+EXPORT_FORMATS = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'arrow': (stream_arrow, 'application/vnd.apache.arrow.stream')
+}
+
+@app.route('/api/top-traders/export', methods=['GET'])
+async def export_top_traders():
+    # Streams every matching top_traders row in one response as NDJSON or an Arrow IPC stream
+    period = request.args.get('period')
+    export_format = request.args.get('format', 'ndjson')
+    updated_since = request.args.get('updated_since')
+
+    valid_periods = ['30d', '7d', '3d', '1d']
+    if period is not None and period not in valid_periods:
+        return jsonify({'error': 'Invalid period. Must be one of: 30d, 7d, 3d, 1d'}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid format. Must be one of: ndjson, arrow'}), 400
+    if updated_since is not None:
+        try:
+            updated_since = datetime.fromisoformat(updated_since)
+        except ValueError:
+            return jsonify({'error': 'Invalid updated_since. Must be an ISO 8601 timestamp'}), 400
+        if updated_since.tzinfo is None:
+            updated_since = updated_since.replace(tzinfo=timezone.utc)
+
+    stream, mimetype = EXPORT_FORMATS[export_format]
+    response = Response(stream(prisma, export_where(period, updated_since), current_app.json.dumps), mimetype=mimetype)
+    # A full export can run well past the default response timeout
+    response.timeout = None
+    return response
+
+# Also EXPLAINed by check_query_plans.py
+TOKEN_TOP_TRADERS_QUERY = """
+    SELECT
+        wallet,
+        `rank`,
+        boughtAmount,
+        boughtVolume,
+        soldAmount,
+        soldVolume,
+        pnl,
+        unrealized
+    FROM top_traders
+    WHERE period = ?
+    AND tokenAddress = ?
+    ORDER BY `rank` ASC
+    LIMIT ?
+"""
+TOP_TRADERS_QUERY = """
+    SELECT
+        wallet,
+        total_bought_amount,
+        total_bought_volume,
+        total_sold_amount,
+        total_sold_volume,
+        total_pnl,
+        pnl_ratio,
+        total_trades
+    FROM top_trader_rollups
+    WHERE period = ?
+    AND pnl_ratio >= ?
+    ORDER BY {order_by} DESC
+    LIMIT ?
+"""
+
+def to_float(value):
+    # unrealized is stored as scraped text, normally already converted to a plain number
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
 @app.route('/api/top-traders/<token_address>', methods=['GET'])
+@versioned_response('top_traders')
 async def get_token_top_traders(token_address):
     period = request.args.get('period', '30d')
     try:
@@ -83,24 +255,8 @@ async def get_token_top_traders(token_address):
     if period not in valid_periods:
         return jsonify({'error': 'Invalid period. Must be one of: 30d, 7d, 3d, 1d'}), 400
 
-    query = f"""
-        SELECT 
-            wallet,
-            rank,
-            boughtAmount,
-            boughtVolume,
-            soldAmount,
-            soldVolume,
-            pnl,
-            unrealizedValue
-        FROM top_traders
-        WHERE period = '{period}' 
-        AND tokenAddress = '{token_address}'
-        ORDER BY rank ASC
-        LIMIT {limit}
-    """
-    
-    results = await prisma.query_raw(query)
+    with observe_db('query_raw', 'top_traders'):
+        results = await prisma.query_raw(TOKEN_TOP_TRADERS_QUERY, period, token_address, limit)
 
     traders = [{
         'wallet': trader['wallet'],
@@ -110,7 +266,7 @@ async def get_token_top_traders(token_address):
         'soldAmount': float(trader['soldAmount']),
         'soldVolume': float(trader['soldVolume']),
         'pnl': float(trader['pnl']),
-        'unrealizedValue': float(trader['unrealizedValue'])
+        'unrealizedValue': to_float(trader['unrealized'])
     } for trader in results]
 
     return jsonify({
@@ -120,6 +276,7 @@ async def get_token_top_traders(token_address):
     })
 
 @app.route('/api/top-traders', methods=['GET'])
+@versioned_response('top_traders')
 async def get_top_traders():
     period = request.args.get('period', '30d')
     try:
@@ -139,29 +296,11 @@ async def get_top_traders():
     if order_by not in valid_orders:
         return jsonify({'error': 'Invalid order_by. Must be one of: total_pnl, pnl_ratio, total_bought_amount, total_bought_volume, total_sold_amount, total_sold_volume, total_trades'}), 400
 
-    query = f"""
-    WITH trader_stats AS (
-        SELECT 
-            wallet,
-            SUM(boughtAmount) as total_bought_amount,
-            SUM(boughtVolume) as total_bought_volume,
-            SUM(soldAmount) as total_sold_amount,
-            SUM(soldVolume) as total_sold_volume,
-            SUM(pnl) as total_pnl,
-            SUM(soldAmount) / SUM(boughtAmount) as pnl_ratio,
-            COUNT(*) as total_trades
-        FROM top_traders
-        WHERE period = '{period}'
-        GROUP BY wallet
-    )
-    SELECT *
-    FROM trader_stats
-    WHERE pnl_ratio >= {min_ratio}
-    ORDER BY {order_by} DESC
-    LIMIT {limit}
-"""
-    
-    results = await prisma.query_raw(query)
+    # order_by is checked against valid_orders above, so it is safe to place in the query
+    query = TOP_TRADERS_QUERY.format(order_by=order_by)
+
+    with observe_db('query_raw', 'top_trader_rollups'):
+        results = await prisma.query_raw(query, period, min_ratio, limit)
 
     traders = [{
         'wallet': trader['wallet'],
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from quart import g, request, Response
+import time
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'API request latency', ['method', 'route', 'status']
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Database query duration', ['operation', 'table']
+)
+ROWS_INGESTED = Counter('rows_ingested_total', 'Rows written by scrapes', ['table'])
+SCRAPER_TOKEN_DURATION = Histogram(
+    'scraper_token_duration_seconds', 'Time spent scraping one token', ['scraper'],
+    buckets=(5, 10, 20, 30, 45, 60, 90, 120, 300)
+)
+
+@contextmanager
+def observe_db(operation, table):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_DURATION.labels(operation, table).observe(time.perf_counter() - start)
+
+def init_metrics(app):
+    @app.before_request
+    async def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    async def observe_request_latency(response):
+        start = g.get('request_start')
+        if start is not None:
+            # The route pattern rather than the path keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.perf_counter() - start)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
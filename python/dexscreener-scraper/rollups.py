@@ -0,0 +1,73 @@
+from datetime import timedelta
+import os
+
+ROLLUP_TABLE = 'top_trader_rollups'
+ROLLUP_CHUNK_SIZE = 500
+ROLLUP_TX_TIMEOUT = int(os.getenv('ROLLUP_TX_TIMEOUT', 120))  # seconds
+
+ROLLUP_SELECT = """
+    SELECT
+        wallet,
+        period,
+        SUM(boughtAmount),
+        SUM(boughtVolume),
+        SUM(soldAmount),
+        SUM(soldVolume),
+        SUM(pnl),
+        SUM(soldAmount) / NULLIF(SUM(boughtAmount), 0),
+        COUNT(*),
+        UTC_TIMESTAMP(3)
+    FROM top_traders
+"""
+
+ROLLUP_INSERT = f"""
+    INSERT INTO {ROLLUP_TABLE} (wallet, period, total_bought_amount, total_bought_volume, total_sold_amount,
+                                total_sold_volume, total_pnl, pnl_ratio, total_trades, updatedAt)
+"""
+
+def pair_placeholders(count):
+    return ', '.join(['(?, ?)'] * count)
+
+def rollup_refresh_select(count):
+    # Totals of `count` (wallet, period) pairs; also EXPLAINed by check_query_plans.py
+    return f"{ROLLUP_SELECT} WHERE (wallet, period) IN ({pair_placeholders(count)}) GROUP BY wallet, period"
+
+async def wallets_at_positions(db, rows):
+    # (wallet, period) pairs currently holding the (token, period, rank) slots about
+    # to be overwritten; a wallet that loses a slot needs its totals recomputed too
+    pairs = set()
+    keys = list({(row[0], row[1], int(row[2])) for row in rows})
+    for i in range(0, len(keys), ROLLUP_CHUNK_SIZE):
+        chunk = keys[i:i + ROLLUP_CHUNK_SIZE]
+        existing = await db.query_raw(
+            f"SELECT wallet, period FROM top_traders WHERE (tokenAddress, period, `rank`) IN "
+            f"({', '.join(['(?, ?, ?)'] * len(chunk))})",
+            *[value for key in chunk for value in key]
+        )
+        pairs.update((row['wallet'], row['period']) for row in existing)
+    return pairs
+
+async def refresh_trader_rollups(db, pairs):
+    # Recomputes the totals of the given (wallet, period) pairs from top_traders,
+    # and drops pairs that no longer have any rows
+    pairs = list(pairs)
+    for i in range(0, len(pairs), ROLLUP_CHUNK_SIZE):
+        chunk = pairs[i:i + ROLLUP_CHUNK_SIZE]
+        args = [value for pair in chunk for value in pair]
+        async with db.tx(timeout=timedelta(seconds=ROLLUP_TX_TIMEOUT)) as tx:
+            await tx.execute_raw(
+                f"DELETE FROM {ROLLUP_TABLE} WHERE (wallet, period) IN ({pair_placeholders(len(chunk))})",
+                *args
+            )
+            await tx.execute_raw(f"{ROLLUP_INSERT} {rollup_refresh_select(len(chunk))}", *args)
+
+async def rebuild_trader_rollups(db):
+    async with db.tx(timeout=timedelta(seconds=ROLLUP_TX_TIMEOUT)) as tx:
+        await tx.execute_raw(f"DELETE FROM {ROLLUP_TABLE}")
+        await tx.execute_raw(f"{ROLLUP_INSERT} {ROLLUP_SELECT} GROUP BY wallet, period")
+
+async def ensure_trader_rollups(db):
+    # Backfills the rollups the first time the service starts against existing data
+    rows = await db.query_raw(f"SELECT EXISTS(SELECT 1 FROM {ROLLUP_TABLE}) AS has_rows")
+    if not rows[0]['has_rows']:
+        await rebuild_trader_rollups(db)
@@ -0,0 +1,145 @@
+from datetime import datetime, timezone
+import asyncio
+import json
+import logging
+import os
+import uuid
+from toptraders import get_tokens, scrape_top_traders
+
+SCRAPE_JOB_HISTORY = int(os.getenv('SCRAPE_JOB_HISTORY', 50))  # finished jobs kept for status lookups
+SCRAPE_EVENTS_KEEPALIVE = int(os.getenv('SCRAPE_EVENTS_KEEPALIVE', 15))  # seconds
+
+logger = logging.getLogger(__name__)
+
+jobs = {}  # job id -> job, oldest first
+active_jobs = {}  # scope -> id of the queued or running job for that scope
+subscribers = {}  # job id -> queues of SSE streams following the job
+job_queue = asyncio.Queue()
+worker = None
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+def job_scope(addresses):
+    return ','.join(sorted(set(addresses))) if addresses else 'all'
+
+def job_view(job):
+    return {
+        'id': job['id'],
+        'scope': job['scope'],
+        'status': job['status'],
+        'total': len(job['tokens']),
+        'completed': sum(status == 'scraped' for status in job['tokens'].values()),
+        'tokens': dict(job['tokens']),
+        'error': job['error'],
+        'createdAt': job['createdAt'],
+        'startedAt': job['startedAt'],
+        'finishedAt': job['finishedAt']
+    }
+
+def publish(job, event):
+    view = job_view(job)
+    for queue in subscribers.get(job['id'], ()):
+        queue.put_nowait((event, view))
+
+def prune_jobs():
+    finished = [id for id, job in jobs.items() if job['status'] in ('succeeded', 'failed')]
+    for id in finished[:max(len(finished) - SCRAPE_JOB_HISTORY, 0)]:
+        del jobs[id]
+
+def submit_scrape(addresses=None):
+    # Returns (job, created); a scope that already has a queued or running job gets that job back
+    scope = job_scope(addresses)
+    if scope in active_jobs:
+        return jobs[active_jobs[scope]], False
+    job = {
+        'id': uuid.uuid4().hex,
+        'scope': scope,
+        'addresses': sorted(set(addresses)) if addresses else None,
+        'status': 'queued',
+        'tokens': {},
+        'error': None,
+        'createdAt': now(),
+        'startedAt': None,
+        'finishedAt': None
+    }
+    jobs[job['id']] = job
+    active_jobs[scope] = job['id']
+    prune_jobs()
+    job_queue.put_nowait(job['id'])
+    return job, True
+
+def update_token(job, address, status):
+    job['tokens'][address] = status
+    if status == 'scraped' and all(s == 'scraped' for s in job['tokens'].values()):
+        job['status'] = 'storing'
+    publish(job, 'progress')
+
+async def run_job(job):
+    loop = asyncio.get_running_loop()
+
+    def progress(address, status):
+        # Called from the scraper thread
+        loop.call_soon_threadsafe(update_token, job, address, status)
+
+    job['status'] = 'running'
+    job['startedAt'] = now()
+    try:
+        tokens = await get_tokens(job['addresses'])
+        job['tokens'] = {token.address: 'pending' for token in tokens}
+        publish(job, 'progress')
+        await scrape_top_traders(tokens, progress)
+        job['status'] = 'succeeded'
+    except Exception as e:
+        logger.error(f"Scrape job {job['id']} failed: {str(e)}")
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        job['finishedAt'] = now()
+        active_jobs.pop(job['scope'], None)
+        publish(job, job['status'])
+        for queue in subscribers.pop(job['id'], ()):
+            queue.put_nowait(None)
+
+async def run_worker():
+    # Jobs run one at a time so there is never more than one Chrome scraping
+    while True:
+        job = jobs.get(await job_queue.get())
+        if job:
+            await run_job(job)
+
+def start_scrape_worker():
+    global worker
+    worker = asyncio.create_task(run_worker())
+
+async def stop_scrape_worker():
+    if worker:
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+async def job_events(job):
+    # Sends the current state, then every change until the job finishes
+    queue = asyncio.Queue()
+    finished = job['status'] in ('succeeded', 'failed')
+    if not finished:
+        subscribers.setdefault(job['id'], []).append(queue)
+    try:
+        yield sse(job['status'] if finished else 'progress', job_view(job))
+        while not finished:
+            try:
+                item = await asyncio.wait_for(queue.get(), SCRAPE_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if item is None:
+                break
+            yield sse(*item)
+    finally:
+        if queue in subscribers.get(job['id'], ()):
+            subscribers[job['id']].remove(queue)
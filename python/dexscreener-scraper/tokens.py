@@ -1,4 +1,3 @@
-from prisma import Prisma
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
@@ -8,7 +7,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 import pandas as pd
 import json
+import math
+import re
 import time
+from db_session import connect_db, closing_db
 
 def load_cookies():
     try:
@@ -44,14 +46,66 @@ def setup_driver():
     
     return driver
 
+METRIC_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+SUBSCRIPT_DIGITS = str.maketrans('₀₁₂₃₄₅₆₇₈₉', '0123456789')
+
+def parse_metric(value):
+    # Turns display strings like "$1.2M", "<$0.01", "-12.5%", "1,234" or "$0.0₄52"
+    # (0.0 followed by four more zeros) into a float, or None when there is no number
+    if not value:
+        return None
+    text = value.strip().replace('$', '').replace(',', '').replace('<', '').replace('%', '')
+    text = re.sub(r'0([₀-₉]+)', lambda m: '0' * int(m.group(1).translate(SUBSCRIPT_DIGITS)), text)
+    multiplier = METRIC_SUFFIXES.get(text[-1:].upper(), 1)
+    if multiplier != 1:
+        text = text[:-1]
+    try:
+        number = float(text) * multiplier
+    except ValueError:
+        return None
+    # float() also accepts 'nan' and 'inf', which would break the min filters and sorts
+    return number if math.isfinite(number) else None
+
+def parse_count(value):
+    number = parse_metric(value)
+    return None if number is None else int(number)
+
+def token_fields(token_data):
+    return {
+        'chain': token_data['Chain'],
+        'dex': token_data['Dex'],
+        'token': token_data['Token'],
+        'price': token_data.get('Price', ''),
+        'age': token_data.get('Age', ''),
+        'txns': token_data.get('Txns', ''),
+        'volume': token_data.get('Volume', ''),
+        'makers': token_data.get('Makers', ''),
+        'trend5m': token_data.get('5M', ''),
+        'trend1h': token_data.get('1H', ''),
+        'trend6h': token_data.get('6H', ''),
+        'trend24h': token_data.get('24H', ''),
+        'liquidity': token_data.get('Liquidity', ''),
+        'mcap': token_data.get('MCAP', ''),
+        'priceUsd': parse_metric(token_data.get('Price')),
+        'txnsCount': parse_count(token_data.get('Txns')),
+        'volumeUsd': parse_metric(token_data.get('Volume')),
+        'makersCount': parse_count(token_data.get('Makers')),
+        'trend5mPct': parse_metric(token_data.get('5M')),
+        'trend1hPct': parse_metric(token_data.get('1H')),
+        'trend6hPct': parse_metric(token_data.get('6H')),
+        'trend24hPct': parse_metric(token_data.get('24H')),
+        'liquidityUsd': parse_metric(token_data.get('Liquidity')),
+        'mcapUsd': parse_metric(token_data.get('MCAP'))
+    }
+
 async def store_to_database(rows_data, header_texts):
-    db = Prisma()
-    await db.connect()
+    db = await connect_db()
 
     for row in rows_data:
         token_data = dict(zip(header_texts, row))
         
         try:
+            fields = token_fields(token_data)
             await db.token.upsert(
                 where={
                     'address': token_data['Address']
@@ -59,43 +113,13 @@ async def store_to_database(rows_data, header_texts):
                 data={
                     'create': {
                         'address': token_data['Address'],
-                        'chain': token_data['Chain'],
-                        'dex': token_data['Dex'],
-                        'token': token_data['Token'],
-                        'price': token_data.get('Price', ''),
-                        'age': token_data.get('Age', ''),
-                        'txns': token_data.get('Txns', ''),
-                        'volume': token_data.get('Volume', ''),
-                        'makers': token_data.get('Makers', ''),
-                        'trend5m': token_data.get('5M', ''),
-                        'trend1h': token_data.get('1H', ''),
-                        'trend6h': token_data.get('6H', ''),
-                        'trend24h': token_data.get('24H', ''),
-                        'liquidity': token_data.get('Liquidity', ''),
-                        'mcap': token_data.get('MCAP', '')
+                        **fields
                     },
-                    'update': {
-                        'chain': token_data['Chain'],
-                        'dex': token_data['Dex'],
-                        'token': token_data['Token'],
-                        'price': token_data.get('Price', ''),
-                        'age': token_data.get('Age', ''),
-                        'txns': token_data.get('Txns', ''),
-                        'volume': token_data.get('Volume', ''),
-                        'makers': token_data.get('Makers', ''),
-                        'trend5m': token_data.get('5M', ''),
-                        'trend1h': token_data.get('1H', ''),
-                        'trend6h': token_data.get('6H', ''),
-                        'trend24h': token_data.get('24H', ''),
-                        'liquidity': token_data.get('Liquidity', ''),
-                        'mcap': token_data.get('MCAP', '')
-                    }
+                    'update': fields
                 }
             )
         except Exception as e:
-            print(f"Error storing token {token_data['Address']}: {str(e)}")
-
-    await db.disconnect()
+            print(f"Error storing token {token_data.get('Address')}: {str(e)}")
 
 async def scrape_data():
     driver = setup_driver()
@@ -193,4 +217,4 @@ async def scrape_data():
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(scrape_data())
+    asyncio.run(closing_db(scrape_data()))
@@ -1,14 +1,18 @@
 from bs4 import BeautifulSoup
-from prisma import Prisma
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+import asyncio
 import json
 import pandas as pd
 import time
+from db_session import connect_db, closing_db
+from rollups import wallets_at_positions, refresh_trader_rollups
+from data_version import bump_data_version
+from metrics import ROWS_INGESTED, SCRAPER_TOKEN_DURATION, observe_db
 
 def load_cookies():
     try:
@@ -22,12 +26,9 @@ def save_cookies(driver):
     with open('cookies.json', 'w') as file:
         json.dump(cookies, file)
 
-async def get_tokens():
-    db = Prisma()
-    await db.connect()
-    tokens = await db.token.find_many()
-    await db.disconnect()
-    return tokens
+async def get_tokens(addresses=None):
+    db = await connect_db()
+    return await db.token.find_many(where={'address': {'in': addresses}} if addresses else None)
 
 def setup_driver():
     options = webdriver.ChromeOptions()
@@ -156,54 +157,60 @@ def extract_table_data(table):
     return data
 
 async def store_to_database(traders_data):
-    db = Prisma()
-    await db.connect()
+    db = await connect_db()
+    # Wallets whose per-period totals change: the ones written and the ones they displace
+    affected = await wallets_at_positions(db, traders_data)
+    affected.update((row[3], row[1]) for row in traders_data)
 
     for row in traders_data:
         try:
-            await db.toptrader.upsert(
-                where={
-                    'tokenAddress_period_rank': {
-                        'tokenAddress': row[0],
-                        'period': row[1],
-                        'rank': int(row[2])
-                    }
-                },
-                data={
-                    'create': {
-                        'tokenAddress': row[0],
-                        'period': row[1],
-                        'rank': int(row[2]),
-                        'wallet': row[3],
-                        'boughtAmount': float(row[4]),
-                        'boughtVolume': float(row[5]),
-                        'soldAmount': float(row[6]),
-                        'soldVolume': float(row[7]),
-                        'pnl': float(row[8]),
-                        'unrealized': row[9],
-                        'balance': row[10],
-                        'transactions': row[11]
+            with observe_db('upsert', 'top_traders'):
+                await db.toptrader.upsert(
+                    where={
+                        'tokenAddress_period_rank': {
+                            'tokenAddress': row[0],
+                            'period': row[1],
+                            'rank': int(row[2])
+                        }
                     },
-                    'update': {
-                        'wallet': row[3],
-                        'boughtAmount': float(row[4]),
-                        'boughtVolume': float(row[5]),
-                        'soldAmount': float(row[6]),
-                        'soldVolume': float(row[7]),
-                        'pnl': float(row[8]),
-                        'unrealized': row[9],
-                        'balance': row[10],
-                        'transactions': row[11]
+                    data={
+                        'create': {
+                            'tokenAddress': row[0],
+                            'period': row[1],
+                            'rank': int(row[2]),
+                            'wallet': row[3],
+                            'boughtAmount': float(row[4]),
+                            'boughtVolume': float(row[5]),
+                            'soldAmount': float(row[6]),
+                            'soldVolume': float(row[7]),
+                            'pnl': float(row[8]),
+                            'unrealized': row[9],
+                            'balance': row[10],
+                            'transactions': row[11]
+                        },
+                        'update': {
+                            'wallet': row[3],
+                            'boughtAmount': float(row[4]),
+                            'boughtVolume': float(row[5]),
+                            'soldAmount': float(row[6]),
+                            'soldVolume': float(row[7]),
+                            'pnl': float(row[8]),
+                            'unrealized': row[9],
+                            'balance': row[10],
+                            'transactions': row[11]
+                        }
                     }
-                }
-            )
+                )
         except Exception as e:
             print(f"Error storing trader data: {str(e)}")
+        else:
+            ROWS_INGESTED.labels('top_traders').inc()
 
-    await db.disconnect()
+    with observe_db('refresh_rollups', 'top_trader_rollups'):
+        await refresh_trader_rollups(db, affected)
 
-async def scrape_top_traders():
-    tokens = await get_tokens()
+def collect_top_traders(tokens, progress=None):
+    # progress(token_address, status) is called from this thread as each token starts and finishes
     driver = setup_driver()
     periods = ['30d', '7d', '3d', '1d']
     all_traders_data = []
@@ -226,6 +233,8 @@ async def scrape_top_traders():
     try:
         for index, token in enumerate(tokens, 1):
             token_start_time = time.time()
+            if progress:
+                progress(token.address, 'scraping')
             token_traders_data = []
             retries = 0
             while retries < max_retries:
@@ -295,20 +304,35 @@ async def scrape_top_traders():
             all_traders_data.extend(token_traders_data)
                 
             token_time = time.time() - token_start_time
+            SCRAPER_TOKEN_DURATION.labels('dexscreener').observe(token_time)
             total_time = time.time() - start_time
             print(f"Token {index}/{total_tokens}: {token.token} | Time for token: {token_time:.2f}s | Total time: {total_time:.2f}s")
+            if progress:
+                progress(token.address, 'scraped')
             time.sleep(2)
 
     finally:
         save_cookies(driver)
         driver.quit()
-    
+
+    return all_traders_data
+
+async def scrape_top_traders(tokens=None, progress=None):
+    if tokens is None:
+        tokens = await get_tokens()
+    # Selenium blocks, so the browser runs in a worker thread and the event loop keeps serving requests
+    all_traders_data = await asyncio.to_thread(collect_top_traders, tokens, progress)
+
     # Store all data in the database
     batch_size = 100
     for i in range(0, len(all_traders_data), batch_size):
         batch = all_traders_data[i:i + batch_size]
         await store_to_database(batch)
+    if all_traders_data:
+        # One version per scrape, once every batch is in, so pollers of the top trader
+        # endpoints revalidate against the complete data
+        db = await connect_db()
+        await bump_data_version(db, 'top_traders')
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(scrape_top_traders())
+    asyncio.run(closing_db(scrape_top_traders()))
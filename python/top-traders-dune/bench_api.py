@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from itertools import count
+from types import SimpleNamespace
+from bench_row_conversion import dune_timestamp, make_fixture
+
+# Load test for the API with Dune replaced by a local stand-in that serves fixture
+# files, so the queue, ingest and read paths can be measured without Dune credits.
+# Needs the MySQL database from DATABASE_URL; the bench tables are overwritten.
+#
+# Usage:
+#   python bench_api.py --write-fixtures bench_fixtures
+#   python bench_api.py --fixtures bench_fixtures --concurrency 50 --requests 5000 --dune-latency 2
+#
+# Set DUNE_RATE_PER_MINUTE / DUNE_RATE_BURST high to measure the service without the Dune rate limit.
+
+FIRST_BUY_QUERY = 4858794
+TOKEN_PROFITABLE_QUERY = 4639226
+HOLDING_TIMES_QUERY = 4639965
+BENCH_TOKEN_PREFIX = 'benchmint'
+
+def write_fixtures(path, wallets, seed=42):
+    # One JSON file of Dune rows per query id, plus the KOL leaderboards
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    base = make_fixture(wallets, seed)
+    periods = [1, 7, 30]
+    fixtures = {
+        FIRST_BUY_QUERY: base[:50],
+        TOKEN_PROFITABLE_QUERY: base[:200],
+        HOLDING_TIMES_QUERY: base[:1],
+        4629509: [{
+            'trader_id': w['trader_id'], 'period': period, 'total_profit': w['total_profit'],
+            'total_buy_usd': w['total_buy_usd'], 'total_sell_usd': w['total_sell_usd'],
+            'total_trades': w['total_trades'], 'total_wins': w['total_wins'],
+            'total_losses': w['total_losses'], 'win_rate': w['win_rate'], 'pnl_ratio': w['pnl_ratio'],
+        } for w in base for period in periods],
+        4683382: [{
+            'trader_id': w['trader_id'], 'period': period, 'total_transaction_count': rng.randint(0, 100),
+            'total_profit': w['total_profit'], 'total_buy_usd': w['total_buy_usd'],
+            'total_sell_usd': w['total_sell_usd'], 'total_trades': w['total_trades'],
+            'total_wins': w['total_wins'], 'total_losses': w['total_losses'], 'win_rate': w['win_rate'],
+            'avg_profit_per_trade': w['avg_profit_per_trade'], 'total_volume_bought': w['total_buy_usd'],
+            'total_volume_sold': w['total_sell_usd'], 'total_volume_traded': w['total_buy_usd'] + w['total_sell_usd'],
+            'pnl_ratio': w['pnl_ratio'], 'last_trade_time': w['last_trade_time'], 'rn': i + 1,
+        } for i, w in enumerate(base) for period in periods],
+        4629656: [{
+            'days': period, 'trader_id': w['trader_id'], 'total_volume_usd': w['total_buy_usd'] + w['total_sell_usd'],
+            'total_trades': w['total_trades'], 'avg_trade_size_usd': w['avg_profit_per_trade'],
+            'last_trade_time': w['last_trade_time'],
+        } for w in base for period in periods],
+        4629687: [{
+            'days': period, 'trader_id': w['trader_id'], 'total_transactions': w['total_trades'],
+            'avg_daily_transactions': w['total_trades'] / period, 'total_volume_usd': w['total_buy_usd'],
+            'avg_trade_size_usd': w['avg_profit_per_trade'], 'last_trade_time': w['last_trade_time'],
+        } for w in base for period in periods],
+        4656172: [{
+            'token_mint_address': f'{BENCH_TOKEN_PREFIX}{i}', 'symbol': f'TKN{i}', 'name': f'Token {i}',
+            'decimals': 6, 'created_at': dune_timestamp(rng), 'init_tx': f'tx{i}', 'period_days': period,
+            'total_supply': 1e9, 'current_price': rng.random(), 'max_price_in_period': rng.random(),
+            'current_market_cap': rng.uniform(0, 1e7), 'max_market_cap': rng.uniform(0, 1e8),
+            'token_creator': f'creator{i % 20}', 'token_launch_time': dune_timestamp(rng), 'rank': i % 100 + 1,
+        } for i in range(min(wallets, 300)) for period in (2, 7, 30)],
+        'kol_leaderboard': [{
+            'period': period, 'wallet_name': f'kol{i}', 'wallet_address': f'wallet{i}',
+            'win': rng.randint(0, 100), 'loss': rng.randint(0, 100), 'pnl_usd': f'{rng.uniform(0, 1e5):.2f}',
+            'pnl_sol': f'{rng.uniform(0, 500):.2f}', 'telegram': None, 'twitter': None,
+        } for i in range(100) for period in periods],
+        'gmgn_kol': [{
+            'period': period, 'wallet_name': f'kol{i}', 'wallet_address': f'wallet{i}',
+            'pnl_percentage': f'{rng.uniform(0, 500):.1f}%', 'pnl_usd': rng.uniform(0, 1e5),
+            'telegram': None, 'twitter': None, 'win': rng.randint(0, 100), 'loss': rng.randint(0, 100),
+        } for i in range(100) for period in periods],
+    }
+    for name, rows in fixtures.items():
+        with open(os.path.join(path, f'{name}.json'), 'w') as f:
+            json.dump(rows, f)
+    print(f"Wrote {len(fixtures)} fixtures to {path}")
+
+class FakeDuneClient:
+    # Stands in for DuneClient. Calls block for the configured latency like the real
+    # client does; parameterized queries get their parameter values written into the rows.
+    # Parameters named in list_params take a comma separated list, and the fixture rows are
+    # repeated once per item; any other parameter value is written into the rows as is.
+    def __init__(self, fixtures_path, latency=0.0, page_latency=0.0, list_params=()):
+        self.fixtures_path = fixtures_path
+        self.list_params = set(list_params)
+        self.latency = latency
+        self.page_latency = page_latency
+        self.fixtures = {}
+        self.executions = {}
+        self.execution_ids = count(1)
+        self.calls = 0
+
+    def rows(self, name):
+        if name not in self.fixtures:
+            with open(os.path.join(self.fixtures_path, f'{name}.json')) as f:
+                self.fixtures[name] = json.load(f)
+        return self.fixtures[name]
+
+    def execute(self, query_id, params=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        rows = self.rows(query_id)
+        if params:
+            values = {param.key: param.value for param in params}
+            for key in self.list_params & values.keys():
+                items = values.pop(key).split(',')
+                rows = [{**row, key: item} for item in items for row in rows]
+            rows = [{**row, **values} for row in rows]
+        execution_id = f'bench-{query_id}-{next(self.execution_ids)}'
+        self.executions[execution_id] = rows
+        return execution_id, rows
+
+    def run_query(self, query, **kwargs):
+        execution_id, rows = self.execute(query.query_id, query.parameters())
+        return SimpleNamespace(execution_id=execution_id, result=SimpleNamespace(rows=rows))
+
+    def get_latest_result(self, query, max_age_hours=None, sample_count=None, **kwargs):
+        query_id = query if isinstance(query, int) else query.query_id
+        execution_id, rows = self.execute(query_id)
+        if sample_count:
+            rows = rows[:sample_count]
+        return SimpleNamespace(execution_id=execution_id, result=SimpleNamespace(rows=rows))
+
+    def get_execution_results(self, job_id, limit=None, offset=None):
+        self.calls += 1
+        time.sleep(self.page_latency)
+        rows = self.executions[job_id]
+        offset = offset or 0
+        end = len(rows) if limit is None else offset + limit
+        page = rows[offset:end]
+        return SimpleNamespace(get_rows=lambda: page, next_offset=end if end < len(rows) else None)
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def report(name, latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    print(f"{name:<36} {len(ordered):>7} {errors:>6} {len(ordered) / elapsed:>9.1f} "
+          f"{percentile(ordered, 0.50) * 1000:>9.1f} {percentile(ordered, 0.95) * 1000:>9.1f} "
+          f"{percentile(ordered, 0.99) * 1000:>9.1f}")
+
+def request_mix(tokens, wallets):
+    # (route, weight, query args) triples; the on-demand routes spread over the bench tokens
+    # so the first requests for a token go to Dune and later ones are served from MySQL
+    return [
+        ('/api/first-buy-wallets', 3, lambda rng: {'token_mint_address': f'{BENCH_TOKEN_PREFIX}{rng.randrange(tokens)}'}),
+        ('/api/token-profitable-wallets', 3, lambda rng: {'token_mint_address': f'{BENCH_TOKEN_PREFIX}{rng.randrange(tokens)}', 'limit': '100'}),
+        ('/api/wallet-holding-times', 1, lambda rng: {'trader_id': f'wallet{rng.randrange(wallets)}'}),
+        ('/api/profitable-wallets', 2, lambda rng: {'period': rng.choice(['1', '7', '30']), 'limit': '100'}),
+        ('/api/profitable-wallets-tx', 2, lambda rng: {'period': rng.choice(['1', '7', '30']), 'limit': '100'}),
+        ('/api/high-volume-wallets', 2, lambda rng: {'period': rng.choice(['1', '7', '30']), 'limit': '100'}),
+        ('/api/high-transaction-wallets', 2, lambda rng: {'period': rng.choice(['1', '7', '30']), 'limit': '100'}),
+        ('/api/successful-token-deployers', 1, lambda rng: {'period': rng.choice(['2', '7', '30'])}),
+        ('/api/kol-leaderboard', 1, lambda rng: {'period': rng.choice(['1', '7', '30'])}),
+        ('/api/gmgn-kol', 1, lambda rng: {'period': rng.choice(['1', '7', '30'])}),
+    ]
+
+async def seed(main, fake):
+    # Leaderboards go through the real ingest path; the on-demand tables are cleared for the bench tokens
+    from shadow_tables import load_staging_table, publish_staging_tables
+    start = time.perf_counter()
+    for query in main.query_registry.values():
+        await main.refresh_query(query, full_reload=True)
+    for table in ('kol_leaderboard', 'gmgn_kol'):
+        await load_staging_table(main.prisma, table, main.process_kol_rows(fake.rows(table)), [])
+    await publish_staging_tables(main.prisma, ['kol_leaderboard', 'gmgn_kol'])
+    for table in ('EarlyTokenBuyers', 'TokenProfitableWallets'):
+        await main.prisma.execute_raw(f"DELETE FROM `{table}` WHERE token_mint_address LIKE ?", f'{BENCH_TOKEN_PREFIX}%')
+    await main.prisma.execute_raw("DELETE FROM `TokenHoldingTimes` WHERE trader_id LIKE 'wallet%'")
+    print(f"Seeded in {time.perf_counter() - start:.2f}s")
+
+async def run(args):
+    os.environ.setdefault('DUNE_API_KEY', 'bench')
+    # Scheduled refreshes firing mid-run would skew the numbers
+    os.environ['SCHEDULE_RUN_AT_STARTUP'] = '0'
+    import main
+
+    fake = FakeDuneClient(args.fixtures, args.dune_latency, args.page_latency,
+                          ['trader_id'] if main.HOLDING_TIMES_LIST_MODE else [])
+    main.dune = fake
+    mix = request_mix(args.tokens, args.wallets)
+    routes = [route for route, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    make_args = {route: make for route, _, make in mix}
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+
+    async with main.app.test_app() as test_app:
+        await seed(main, fake)
+        client = test_app.test_client()
+        rng = random.Random(args.seed)
+        remaining = iter(range(args.requests))
+
+        async def worker():
+            for _ in remaining:
+                route = rng.choices(routes, weights)[0]
+                start = time.perf_counter()
+                response = await client.get(route, query_string=make_args[route](rng))
+                await response.get_data()
+                latencies[route].append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors[route] += 1
+
+        dune_calls = fake.calls
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s, "
+          f"{fake.calls - dune_calls} fake Dune calls")
+    print(f"{'route':<36} {'count':>7} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route in routes:
+        report(route, latencies[route], errors[route], elapsed)
+    report('all', [l for route in routes for l in latencies[route]], sum(errors.values()), elapsed)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default='bench_fixtures')
+    parser.add_argument('--write-fixtures', metavar='PATH', help='generate synthetic fixtures into PATH and exit')
+    parser.add_argument('--wallets', type=int, default=5000, help='wallets in the generated fixtures')
+    parser.add_argument('--tokens', type=int, default=200, help='distinct tokens requested from the on-demand routes')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--dune-latency', type=float, default=0.5, help='seconds per fake Dune execution')
+    parser.add_argument('--page-latency', type=float, default=0.05, help='seconds per fake Dune results page')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures(args.write_fixtures, args.wallets)
+        return
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
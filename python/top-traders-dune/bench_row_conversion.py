@@ -0,0 +1,87 @@
+import argparse
+import random
+import time
+from row_transforms import (
+    process_first_buy_wallet_row,
+    process_leaderboard_row,
+    convert_first_buy_wallet_rows,
+    convert_leaderboard_rows,
+)
+
+# Compares the per-row Dune conversions with the columnar ones on a synthetic fixture.
+# Usage: python bench_row_conversion.py --rows 100000
+
+def dune_timestamp(rng):
+    return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.{rng.randint(0, 999):03d} UTC"
+
+def make_fixture(count, seed=42):
+    rng = random.Random(seed)
+    wallets = []
+    for i in range(count):
+        wallet = {
+            'token_mint_address': f'mint{i % 100}',
+            'symbol': f'TKN{i % 100}',
+            'token_launch_time': dune_timestamp(rng),
+            'trader_id': f'wallet{i}',
+            'block_time': dune_timestamp(rng),
+            'amount_usd': rng.uniform(0, 10000),
+            'buyer_rank': i % 50 + 1,
+            'shortest_hold_time': rng.uniform(0, 1000),
+            'longest_hold_time': rng.uniform(0, 100000),
+            'average_hold_time': rng.uniform(0, 10000),
+            'shortest_hold_token': f'mint{rng.randint(0, 100)}',
+            'shortest_hold_symbol': rng.choice([None, '', 'ABC']),
+            'longest_hold_token': f'mint{rng.randint(0, 100)}',
+            'longest_hold_symbol': rng.choice([None, 'XYZ']),
+            'total_profit': rng.uniform(-1000, 100000),
+            'total_buy_usd': rng.uniform(0, 100000),
+            'total_sell_usd': rng.uniform(0, 100000),
+            'total_trades': rng.randint(1, 1000),
+            'total_wins': rng.randint(0, 500),
+            'total_losses': rng.randint(0, 500),
+            'win_rate': rng.random(),
+            'avg_profit_per_trade': rng.uniform(-100, 1000),
+            'pnl_ratio': rng.uniform(0, 10),
+            'last_trade_time': dune_timestamp(rng),
+        }
+        for period in ('1d', '7d', '30d'):
+            wallet[f'buy_volume_{period}'] = rng.uniform(0, 100000)
+            wallet[f'sell_volume_{period}'] = rng.uniform(0, 100000)
+            wallet[f'total_pnl_{period}'] = rng.uniform(-10000, 100000)
+            wallet[f'total_trades_{period}'] = rng.randint(0, 1000)
+        wallets.append(wallet)
+    return wallets
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def without_last_updated(rows):
+    return [{k: v for k, v in row.items() if k != 'last_updated'} for row in rows]
+
+def compare(name, per_row, columnar, rows):
+    # Each conversion gets its own copy since the leaderboard conversions work in place
+    expected, per_row_time = timed(lambda: per_row([dict(row) for row in rows]))
+    actual, columnar_time = timed(lambda: columnar([dict(row) for row in rows]))
+    assert without_last_updated(expected) == without_last_updated(actual), f"{name}: outputs differ"
+    print(f"{name:<20} per-row {per_row_time:7.3f}s ({len(rows) / per_row_time:>10,.0f} rows/s)  "
+          f"columnar {columnar_time:7.3f}s ({len(rows) / columnar_time:>10,.0f} rows/s)  "
+          f"speedup {per_row_time / columnar_time:5.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = make_fixture(args.rows)
+    print(f"Converting {len(rows):,} rows")
+    compare('first buy wallets',
+            lambda rows: [process_first_buy_wallet_row(row) for row in rows],
+            convert_first_buy_wallet_rows, rows)
+    compare('leaderboard',
+            lambda rows: [process_leaderboard_row(row) for row in rows],
+            convert_leaderboard_rows, rows)
+
+if __name__ == '__main__':
+    main()
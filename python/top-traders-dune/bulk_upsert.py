@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import time
+from metrics import ROWS_INGESTED, observe_db
+
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+BULK_TX_TIMEOUT = int(os.getenv('BULK_TX_TIMEOUT', 120))  # seconds
+
+logger = logging.getLogger(__name__)
+
+def to_sql_value(value):
+    # MySQL DATETIME(3) doesn't accept the ISO format Prisma would serialize to
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    return value
+
+def upsert_updates(columns, unique_keys):
+    update_columns = [c for c in columns if c not in unique_keys]
+    if not update_columns:
+        return ''
+    return " ON DUPLICATE KEY UPDATE " + ', '.join(f'`{c}` = VALUES(`{c}`)' for c in update_columns)
+
+def build_upsert_query(table, columns, unique_keys, row_count):
+    column_list = ', '.join(f'`{c}`' for c in columns)
+    row_placeholder = '(' + ', '.join(['?'] * len(columns)) + ')'
+    values = ', '.join([row_placeholder] * row_count)
+    return f"INSERT INTO `{table}` ({column_list}) VALUES {values}" + upsert_updates(columns, unique_keys)
+
+def build_upsert_select_query(table, source, columns, unique_keys):
+    column_list = ', '.join(f'`{c}`' for c in columns)
+    return f"INSERT INTO `{table}` ({column_list}) SELECT {column_list} FROM `{source}`" + upsert_updates(columns, unique_keys)
+
+async def upsert_chunks(tx, table, rows, unique_keys, chunk_size=None):
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    columns = list(rows[0].keys())
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        query = build_upsert_query(table, columns, unique_keys, len(chunk))
+        args = [to_sql_value(row.get(c)) for row in chunk for c in columns]
+        await tx.execute_raw(query, *args)
+
+async def delete_chunks(tx, table, keys, unique_keys, chunk_size=None):
+    # keys are lists of unique key values in unique_keys order
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    key_columns = ', '.join(f'`{c}`' for c in unique_keys)
+    key_placeholder = '(' + ', '.join(['?'] * len(unique_keys)) + ')'
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i + chunk_size]
+        query = f"DELETE FROM `{table}` WHERE ({key_columns}) IN ({', '.join([key_placeholder] * len(chunk))})"
+        await tx.execute_raw(query, *[to_sql_value(v) for key in chunk for v in key])
+
+def bulk_transaction(db):
+    return db.tx(timeout=timedelta(seconds=BULK_TX_TIMEOUT))
+
+# Writes rows as chunked multi-row INSERT ... ON DUPLICATE KEY UPDATE statements
+# inside one transaction, so store time grows with the number of chunks, not rows
+async def bulk_upsert(db, table, rows, unique_keys, chunk_size=None):
+    if not rows:
+        return 0
+
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    start_time = time.time()
+
+    with observe_db('bulk_upsert', table):
+        async with bulk_transaction(db) as tx:
+            await upsert_chunks(tx, table, rows, unique_keys, chunk_size)
+    ROWS_INGESTED.labels(table).inc(len(rows))
+
+    elapsed = time.time() - start_time
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"Bulk upserted {len(rows)} rows into {table} in {elapsed:.2f}s ({rate:.0f} rows/s, chunk size {chunk_size})")
+    return len(rows)
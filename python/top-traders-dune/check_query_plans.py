@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from dune_client.query import QueryBase
+from dune_client.types import QueryParameter
+from bench_api import (
+    BENCH_TOKEN_PREFIX,
+    FIRST_BUY_QUERY,
+    TOKEN_PROFITABLE_QUERY,
+    HOLDING_TIMES_QUERY,
+    FakeDuneClient,
+    write_fixtures,
+    seed,
+)
+
+# Runs EXPLAIN on the SQL behind each endpoint and exits non-zero when a query
+# reads a table with a full scan or sorts with a filesort. Run it against a
+# seeded database; --seed loads the bench_api.py fixtures first (overwriting the
+# bench tables), since on near-empty tables MySQL prefers scans regardless of indexes.
+#
+# Usage: python check_query_plans.py [--seed]
+
+TOKEN = 'benchmint1'
+WALLET = 'wallet1'
+
+# (endpoint, SQL matching the Prisma query the endpoint issues, args)
+QUERIES = [
+    ('/api/first-buy-wallets',
+     "SELECT * FROM `EarlyTokenBuyers` WHERE `token_mint_address` = ? ORDER BY `buyer_rank` ASC", [TOKEN]),
+    ('/api/token-profitable-wallets',
+     "SELECT * FROM `TokenProfitableWallets` WHERE `token_mint_address` = ? AND `last_updated` >= ? "
+     "ORDER BY `total_profit` DESC, `id` DESC LIMIT 100", [TOKEN, 0]),
+    ('/api/profitable-wallets',
+     "SELECT * FROM `most_profitable_wallets` WHERE `period` = ? ORDER BY `total_profit` DESC, `id` DESC LIMIT 100", [30]),
+    ('/api/profitable-wallets (next page)',
+     "SELECT * FROM `most_profitable_wallets` WHERE `period` = ? AND (`total_profit` < ? OR (`total_profit` = ? AND `id` < ?)) "
+     "ORDER BY `total_profit` DESC, `id` DESC LIMIT 100", [30, 1000.0, 1000.0, 1000]),
+    ('/api/profitable-wallets-tx',
+     "SELECT * FROM `most_profitable_wallets_tx` WHERE `period` = ? AND `total_transaction_count` >= ? "
+     "AND `total_transaction_count` <= ? ORDER BY `total_profit` DESC, `id` DESC LIMIT 100", [30, 0, 100]),
+    ('/api/high-volume-wallets',
+     "SELECT * FROM `high_activity_wallets_by_volume` WHERE `days` = ? ORDER BY `total_volume_usd` DESC, `id` DESC LIMIT 100", [30]),
+    ('/api/high-transaction-wallets',
+     "SELECT * FROM `high_activity_wallets_by_transactions` WHERE `days` = ? ORDER BY `total_transactions` DESC, `id` DESC LIMIT 100", [30]),
+    ('/api/wallet-holding-times',
+     "SELECT * FROM `TokenHoldingTimes` WHERE `trader_id` = ? LIMIT 1", [WALLET]),
+    ('/api/successful-token-deployers',
+     "SELECT * FROM `token_deployer_success` WHERE `period_days` = ? ORDER BY `max_market_cap` DESC", [30]),
+    ('/api/kol-leaderboard',
+     "SELECT * FROM `kol_leaderboard` WHERE `period` = ? ORDER BY `pnl_usd` DESC", [1]),
+    ('/api/gmgn-kol',
+     "SELECT * FROM `gmgn_kol` WHERE `period` = ? ORDER BY `pnl_usd` DESC", [1]),
+    ('/api/wallets/<address>',
+     "SELECT * FROM `wallet_profile` WHERE `address` = ?", [WALLET]),
+]
+
+def plan_problems(plan):
+    problems = []
+    for step in plan:
+        extra = step.get('Extra') or ''
+        if step.get('type') == 'ALL':
+            problems.append(f"full scan of {step['table']}")
+        if 'Using filesort' in extra:
+            problems.append(f"filesort on {step['table']}")
+    return problems
+
+async def check_plans(db):
+    tables = sorted({sql.split('FROM `')[1].split('`')[0] for _, sql, _ in QUERIES})
+    for table in tables:
+        await db.query_raw(f"ANALYZE TABLE `{table}`")
+
+    failures = 0
+    for endpoint, sql, args in QUERIES:
+        plan = await db.query_raw(f"EXPLAIN {sql}", *args)
+        problems = plan_problems(plan)
+        keys = ', '.join(str(step.get('key')) for step in plan)
+        print(f"{'FAIL' if problems else 'ok':<5} {endpoint:<40} key: {keys}  {'; '.join(problems)}")
+        failures += bool(problems)
+    return failures
+
+async def seed_on_demand(main, fake, tokens, wallets):
+    # The bench seed clears the on-demand tables for the bench tokens, so fill them through the store path
+    for i in range(tokens):
+        params = [QueryParameter.text_type(name='token_mint_address', value=f'{BENCH_TOKEN_PREFIX}{i}')]
+        for query_id in (FIRST_BUY_QUERY, TOKEN_PROFITABLE_QUERY):
+            result = fake.run_query(QueryBase(query_id=query_id, params=params))
+            await main.store_dune_results(query_id, result, params)
+    for i in range(wallets):
+        params = [QueryParameter.text_type(name='trader_id', value=f'wallet{i}')]
+        result = fake.run_query(QueryBase(query_id=HOLDING_TIMES_QUERY, params=params))
+        await main.store_dune_results(HOLDING_TIMES_QUERY, result, params)
+
+async def run(args):
+    # Scheduled refreshes would rewrite the seeded tables during the check
+    os.environ['SCHEDULE_RUN_AT_STARTUP'] = '0'
+    import main
+
+    async with main.app.test_app():
+        if args.seed:
+            with tempfile.TemporaryDirectory() as fixtures:
+                write_fixtures(fixtures, args.wallets)
+                fake = FakeDuneClient(fixtures)
+                main.dune = fake
+                await seed(main, fake)
+                await seed_on_demand(main, fake, args.tokens, args.holding_wallets)
+        return await check_plans(main.prisma)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', action='store_true', help='load the bench fixtures before checking')
+    parser.add_argument('--wallets', type=int, default=20000, help='wallets in the leaderboard fixtures')
+    parser.add_argument('--tokens', type=int, default=200, help='tokens seeded into the on-demand tables')
+    parser.add_argument('--holding-wallets', type=int, default=500, help='wallets seeded into TokenHoldingTimes')
+    args = parser.parse_args()
+    failures = asyncio.run(run(args))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
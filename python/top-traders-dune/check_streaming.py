@@ -0,0 +1,97 @@
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+from quart import Quart
+import pagination
+from pagination import list_response
+
+# Reads list responses through app.test_client(), streamed and paged, from an in-memory
+# model and checks both return the same rows. The streamed body is written after the view
+# returns, so this catches anything in it that needs the app context.
+#
+# Usage: python check_streaming.py
+
+ROWS = 1234
+
+def matches(row, where):
+    for field, condition in where.items():
+        if field == 'OR':
+            if not any(matches(row, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            if 'lt' in condition and not getattr(row, field) < condition['lt']:
+                return False
+        elif getattr(row, field) != condition:
+            return False
+    return True
+
+class FakeWalletActions:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def find_many(self, where, order, take=None):
+        rows = sorted(
+            (row for row in self.rows if matches(row, where)),
+            key=lambda row: tuple(getattr(row, field) for part in order for field in part),
+            reverse=True
+        )
+        return rows if take is None else rows[:take]
+
+def format_row(row):
+    return {'id': row.id, 'wallet': row.wallet, 'total_profit': row.total_profit}
+
+def build_app(model):
+    app = Quart(__name__)
+
+    @app.route('/wallets')
+    async def wallets():
+        return await list_response(model, {'period': 30}, 'total_profit', format_row, meta={'period': 30})
+
+    return app
+
+async def read_pages(client, limit):
+    rows = []
+    cursor = None
+    while True:
+        response = await client.get('/wallets', query_string={'limit': limit, **({'cursor': cursor} if cursor else {})})
+        body = await response.get_json()
+        rows.extend(body['wallets'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return rows
+
+async def run():
+    # Repeated profits make the id tie-break matter across page boundaries
+    model = FakeWalletActions([
+        SimpleNamespace(id=i, wallet=f'wallet{i}', total_profit=float(i % 97), period=30 if i % 5 else 7)
+        for i in range(ROWS)
+    ])
+    pagination.STREAM_PAGE_SIZE = 100
+    app = build_app(model)
+    failures = []
+    async with app.test_app():
+        client = app.test_client()
+        expected = [format_row(row) for row in await model.find_many({'period': 30}, [{'total_profit': 0}, {'id': 0}])]
+
+        response = await client.get('/wallets', query_string={'stream': '1'})
+        body = json.loads(await response.get_data())
+        if response.status_code != 200 or body['wallets'] != expected or body['period'] != 30:
+            failures.append('stream=1 did not return every row followed by the meta fields')
+
+        response = await client.get('/wallets', query_string={'stream': '1', 'limit': 250})
+        body = json.loads(await response.get_data())
+        if body['wallets'] != expected[:250]:
+            failures.append('stream=1 with a limit did not return the first rows')
+
+        if await read_pages(client, 100) != expected:
+            failures.append('limit/cursor pages did not return every row once in order')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if not failures:
+        print(f'ok   streamed and paged {len(expected)} rows')
+    return len(failures)
+
+if __name__ == '__main__':
+    sys.exit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,49 @@
+from prisma import Prisma
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
+import os
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # MySQL connections held by the process
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds a query waits for a free connection
+
+_db = None
+_connect_lock = None
+
+def pooled_url(url, pool_size=DB_POOL_SIZE, pool_timeout=DB_POOL_TIMEOUT):
+    # Prisma's query engine reads its pool settings from the connection string
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query['connection_limit'] = str(pool_size)
+    query['pool_timeout'] = str(pool_timeout)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def get_db():
+    # One client per process. Its query engine owns the connection pool, so every
+    # caller shares the same MySQL connections across batches and scraper runs.
+    global _db
+    if _db is None:
+        url = os.getenv('DATABASE_URL')
+        _db = Prisma(datasource={'url': pooled_url(url)}) if url else Prisma()
+    return _db
+
+async def connect_db():
+    # Returns the shared client, connecting it on first use; it stays connected afterwards
+    global _connect_lock
+    if _connect_lock is None:
+        _connect_lock = asyncio.Lock()
+    db = get_db()
+    async with _connect_lock:
+        if not db.is_connected():
+            await db.connect()
+    return db
+
+async def disconnect_db():
+    if _db is not None and _db.is_connected():
+        await _db.disconnect()
+
+async def closing_db(coro):
+    # For scripts run on their own: awaits coro, then releases the pool
+    try:
+        return await coro
+    finally:
+        await disconnect_db()
@@ -0,0 +1,134 @@
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import logging
+import os
+import random
+import time
+from metrics import DUNE_EXECUTION_DURATION, DUNE_RETRY_BACKOFF
+
+DUNE_POOL_SIZE = int(os.getenv('DUNE_POOL_SIZE', 4))  # concurrent executions allowed by our Dune plan
+DUNE_RATE_PER_MINUTE = float(os.getenv('DUNE_RATE_PER_MINUTE', 40))
+DUNE_RATE_BURST = int(os.getenv('DUNE_RATE_BURST', 10))
+DUNE_CALL_TIMEOUT = int(os.getenv('DUNE_CALL_TIMEOUT', 600))  # seconds
+DUNE_MAX_RETRIES = int(os.getenv('DUNE_MAX_RETRIES', 3))
+DUNE_BACKOFF_BASE = float(os.getenv('DUNE_BACKOFF_BASE', 1))  # seconds
+DUNE_BACKOFF_MAX = float(os.getenv('DUNE_BACKOFF_MAX', 60))  # seconds
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Returns how long the caller was throttled, 0 when it neither queued behind
+        # another throttled caller nor had to wait for a token itself
+        start = time.monotonic()
+        waited = self.lock.locked()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start if waited else 0.0
+                waited = True
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def get_retry_after(error):
+    # requests' HTTPError carries the response; Dune sends Retry-After on 429s
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, retry_after=None):
+    # Full jitter keeps concurrent retries from hitting Dune in lockstep
+    delay = random.uniform(0, min(DUNE_BACKOFF_MAX, DUNE_BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+class DuneExecutor:
+    def __init__(self, pool_size=DUNE_POOL_SIZE, rate_per_minute=DUNE_RATE_PER_MINUTE, burst=DUNE_RATE_BURST):
+        self.pool_size = pool_size
+        self.pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='dune')
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.latencies = defaultdict(lambda: deque(maxlen=500))
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.active = 0
+
+    def record_attempt(self, name, start):
+        self.active -= 1
+        elapsed = time.perf_counter() - start
+        self.latencies[name].append(elapsed)
+        DUNE_EXECUTION_DURATION.labels(name).observe(elapsed)
+
+    async def call(self, name, fn, *args, max_retries=DUNE_MAX_RETRIES):
+        loop = asyncio.get_running_loop()
+        for attempt in range(max_retries):
+            throttled = await self.bucket.acquire()
+            if throttled:
+                self.counts[name]['throttled_seconds'] += throttled
+            start = time.perf_counter()
+            self.active += 1
+            try:
+                try:
+                    result = await asyncio.wait_for(
+                        loop.run_in_executor(self.pool, lambda: fn(*args)),
+                        timeout=DUNE_CALL_TIMEOUT
+                    )
+                finally:
+                    # Recorded before any backoff, so latency and active cover only the call itself
+                    self.record_attempt(name, start)
+                self.counts[name]['success'] += 1
+                return result
+            except Exception as e:
+                self.counts[name]['error'] += 1
+                if attempt == max_retries - 1:
+                    raise
+                delay = backoff_delay(attempt, get_retry_after(e))
+                self.counts[name]['retry'] += 1
+                self.counts[name]['backoff_seconds'] += delay
+                DUNE_RETRY_BACKOFF.labels(name).observe(delay)
+                logger.warning(f"Dune {name} failed (attempt {attempt + 1}/{max_retries}): {str(e)}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        calls = {}
+        for name, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            calls[name] = {
+                **self.counts[name],
+                'avg_seconds': sum(ordered) / len(ordered) if ordered else 0.0,
+                'p50_seconds': ordered[len(ordered) // 2] if ordered else 0.0,
+                'p95_seconds': ordered[int(len(ordered) * 0.95)] if ordered else 0.0,
+                'max_seconds': ordered[-1] if ordered else 0.0,
+            }
+        return {
+            'pool_size': self.pool_size,
+            'active': self.active,
+            'rate_tokens': round(self.bucket.tokens, 2),
+            'calls': calls,
+        }
@@ -0,0 +1,154 @@
+from collections import defaultdict, deque
+import asyncio
+import itertools
+import logging
+import os
+import time
+from metrics import DUNE_QUEUE_WAIT
+
+DUNE_QUEUE_WORKERS = int(os.getenv('DUNE_QUEUE_WORKERS', 4))
+DUNE_QUERY_CONCURRENCY = int(os.getenv('DUNE_QUERY_CONCURRENCY', 2))  # per query_id
+DUNE_INTERACTIVE_RESERVE = int(os.getenv('DUNE_INTERACTIVE_RESERVE', 1))  # workers background requests cannot take
+
+PRIORITY_INTERACTIVE = 0  # API requests with a client waiting on them
+PRIORITY_BACKGROUND = 10  # scheduled refreshes
+
+logger = logging.getLogger(__name__)
+
+class DuneRequest:
+    def __init__(self, query_id, key, params=None, priority=PRIORITY_INTERACTIVE, store=True):
+        self.query_id = query_id
+        self.key = key
+        self.params = params
+        self.priority = priority
+        self.store = store
+        self.timestamp = time.time()
+        self.started_at = None
+        self.status = "queued"  # queued, processing, completed, failed
+        self.background = False  # set when the request starts, so its slot is released the same way
+        # Shared by every caller waiting on this query_id/params pair
+        self.future = asyncio.get_event_loop().create_future()
+
+class DuneScheduler:
+    def __init__(self, execute, workers=DUNE_QUEUE_WORKERS, per_query_limit=DUNE_QUERY_CONCURRENCY,
+                 interactive_reserve=DUNE_INTERACTIVE_RESERVE):
+        self.execute = execute
+        self.workers = workers
+        self.per_query_limit = per_query_limit
+        # With a single worker nothing can be reserved, so background work may use it
+        self.background_limit = max(workers - interactive_reserve, 1)
+        self.requests = defaultdict(dict)  # query_id -> key -> DuneRequest, queued or running
+        self.queue = None
+        self.tasks = []
+        self.running = defaultdict(int)  # query_id -> requests executing
+        self.running_background = 0
+        # Heap entries popped while their query_id, or the background share, was at its limit.
+        # They go back on the queue when a slot frees up instead of holding a worker meanwhile
+        self.parked = defaultdict(list)  # query_id -> entries
+        self.parked_background = []
+        self.counter = itertools.count()  # FIFO order within a priority
+        self.wait_times = deque(maxlen=500)
+
+    def start(self):
+        self.queue = asyncio.PriorityQueue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started Dune scheduler with {self.workers} workers, {self.per_query_limit} per query")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, query_id, key, params=None, priority=PRIORITY_INTERACTIVE, store=True):
+        request_info = self.requests[query_id].get(key)
+        if request_info:
+            # An interactive caller joining a queued background request bumps it forward;
+            # the stale heap entry is skipped by the worker that pops it
+            if priority < request_info.priority and request_info.status == "queued":
+                request_info.priority = priority
+                self.queue.put_nowait((priority, next(self.counter), request_info))
+            return request_info.future
+
+        request_info = DuneRequest(query_id, key, params, priority, store)
+        self.requests[query_id][key] = request_info
+        self.queue.put_nowait((priority, next(self.counter), request_info))
+        return request_info.future
+
+    def _parking(self, request_info):
+        # The list the request has to wait in, or None when it can start now
+        if self.running[request_info.query_id] >= self.per_query_limit:
+            return self.parked[request_info.query_id]
+        if request_info.priority > PRIORITY_INTERACTIVE and self.running_background >= self.background_limit:
+            return self.parked_background
+        return None
+
+    def _release(self, request_info):
+        self.running[request_info.query_id] -= 1
+        for entry in self.parked.pop(request_info.query_id, []):
+            self.queue.put_nowait(entry)
+        if request_info.background:
+            self.running_background -= 1
+            for entry in self.parked_background:
+                self.queue.put_nowait(entry)
+            self.parked_background = []
+
+    async def _worker(self):
+        while True:
+            entry = await self.queue.get()
+            request_info = entry[2]
+            try:
+                if request_info.status != "queued":
+                    continue
+                parking = self._parking(request_info)
+                if parking is not None:
+                    parking.append(entry)
+                    continue
+                await self._run(request_info)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, request_info):
+        # No await between the slot check in _worker and taking the slot here
+        request_info.status = "processing"
+        request_info.background = request_info.priority > PRIORITY_INTERACTIVE
+        self.running[request_info.query_id] += 1
+        if request_info.background:
+            self.running_background += 1
+        try:
+            request_info.started_at = time.time()
+            wait = request_info.started_at - request_info.timestamp
+            self.wait_times.append(wait)
+            DUNE_QUEUE_WAIT.labels('background' if request_info.background else 'interactive').observe(wait)
+            try:
+                result = await self.execute(request_info)
+                request_info.status = "completed"
+                request_info.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error processing Dune query {request_info.query_id}: {str(e)}")
+                request_info.status = "failed"
+                request_info.future.set_exception(e)
+        finally:
+            self.requests[request_info.query_id].pop(request_info.key, None)
+            self._release(request_info)
+
+    def stats(self):
+        now = time.time()
+        pending = [r for requests in self.requests.values() for r in requests.values()]
+        queued = [r for r in pending if r.status == "queued"]
+        waits = list(self.wait_times)
+        return {
+            'workers': self.workers,
+            'per_query_limit': self.per_query_limit,
+            'background_limit': self.background_limit,
+            'queue_depth': len(queued),
+            'queue_depth_by_priority': {
+                'interactive': sum(1 for r in queued if r.priority <= PRIORITY_INTERACTIVE),
+                'background': sum(1 for r in queued if r.priority > PRIORITY_INTERACTIVE),
+            },
+            'in_flight': len(pending) - len(queued),
+            'parked': sum(len(entries) for entries in self.parked.values()) + len(self.parked_background),
+            'oldest_wait_seconds': max((now - r.timestamp for r in queued), default=0.0),
+            'avg_wait_seconds': sum(waits) / len(waits) if waits else 0.0,
+            'max_wait_seconds': max(waits, default=0.0),
+        }
@@ -1,4 +1,3 @@
-from prisma import Prisma
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -11,6 +10,7 @@ from datetime import datetime
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from seleniumbase import Driver
+from db_session import connect_db, closing_db
 
 def setup_driver():
     options = webdriver.ChromeOptions()
@@ -116,6 +116,19 @@ def click_svg_icon(driver, logger):
         logger.error(f"Failed to click SVG icon: {str(e)}")
         return False
 
+def format_record(record):
+    return {
+        'period': record['period'],
+        'wallet_name': record['wallet_name'],
+        'wallet_address': record['wallet_address'],
+        'pnl_percentage': record['pnl_percentage'],
+        'pnl_usd': float(record['pnl_usd']),
+        'telegram': record['telegram'],
+        'twitter': record['twitter'],
+        'win': int(record['win']),
+        'loss': int(record['loss'])
+    }
+
 def extract_data(driver, period, logger):
     # Reduced wait time but still giving enough time for data to load
     time.sleep(8)  
@@ -162,7 +175,8 @@ def extract_data(driver, period, logger):
             win = win_loss[1].text.strip().replace(',','')
             loss = win_loss[2].text.strip().replace(',','')
             
-            data.append({
+            # Converted here so a malformed row is skipped like any other unreadable one
+            data.append(format_record({
                 'period': period_days[period],
                 'wallet_name': wallet_name,
                 'wallet_address': wallet_address,
@@ -172,7 +186,7 @@ def extract_data(driver, period, logger):
                 'pnl_usd': pnl_usd,
                 'telegram': None,
                 'twitter': twitter
-            })
+            }))
             
         except Exception as e:
             logger.warning(f"Failed to extract data for a user: {str(e)}")
@@ -183,8 +197,7 @@ def extract_data(driver, period, logger):
 
 async def save_to_database(data, logger):
     logger.info(f"Saving {len(data)} records to database")
-    db = Prisma()
-    await db.connect()
+    db = await connect_db()
     
     success_count = 0
     error_count = 0
@@ -236,11 +249,10 @@ async def save_to_database(data, logger):
             logger.error(f"Error storing record for {record['wallet_address']}: {str(e)}")
             error_count += 1
 
-    await db.disconnect()
     logger.info(f"Database operation completed: {success_count} records saved, {error_count} errors")
     return success_count, error_count
 
-async def scrape_gmgn():
+async def scrape_gmgn(save=True):
     logger = setup_logging()
     logger.info("Initializing scraper")
     
@@ -272,16 +284,18 @@ async def scrape_gmgn():
     
     finally:
         # Always save data before exiting, even if there was an error
-        if all_data:
+        if all_data and save:
             logger.info(f"Saving all collected data ({len(all_data)} records) before exiting")
             success, errors = await save_to_database(all_data, logger)
             logger.info(f"Final database save: {success} successful, {errors} failed")
-        else:
+        elif not all_data:
             logger.warning("No data collected to save")
             
         driver.quit()
         logger.info("Scraping process completed, browser closed")
 
+    return all_data
+
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(scrape_gmgn())
+    asyncio.run(closing_db(scrape_gmgn()))
@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+DUNE_PAGE_SIZE = int(os.getenv('DUNE_PAGE_SIZE', 5000))  # rows per results page
+DUNE_PAGE_PREFETCH = int(os.getenv('DUNE_PAGE_PREFETCH', 2))  # pages downloaded ahead of the writer
+
+_DONE = object()
+
+async def fetch_result_pages(dune_executor, dune, execution_id, page_size=DUNE_PAGE_SIZE, prefetch=DUNE_PAGE_PREFETCH):
+    # Pages through an execution's results with limit/offset. Later pages download
+    # while the consumer writes the current one, and at most `prefetch` pages are buffered.
+    pages = asyncio.Queue(maxsize=prefetch)
+
+    async def download():
+        try:
+            offset = 0
+            while True:
+                page = await dune_executor.call(
+                    'get_execution_results', dune.get_execution_results, execution_id, page_size, offset
+                )
+                await pages.put(page.get_rows())
+                if page.next_offset is None:
+                    break
+                offset = page.next_offset
+            await pages.put(_DONE)
+        except Exception as e:
+            await pages.put(e)
+
+    task = asyncio.create_task(download())
+    try:
+        while True:
+            page = await pages.get()
+            if page is _DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        task.cancel()
+
+async def convert_pages(pages, convert):
+    # convert takes a whole page of rows, so it can work column by column
+    async for rows in pages:
+        yield convert(rows)
@@ -1,4 +1,3 @@
-from prisma import Prisma
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,6 +12,7 @@ import re
 from datetime import datetime
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from db_session import connect_db, closing_db
 
 
 def setup_driver():
@@ -152,8 +152,7 @@ def extract_data(driver, period, logger):
     return data
 
 async def save_to_database(data):
-    db = Prisma()
-    await db.connect()
+    db = await connect_db()
 
     for record in data:
         try:
@@ -188,11 +187,10 @@ async def save_to_database(data):
         except Exception as e:
             print(f"Error storing record for {record['wallet_address']}: {str(e)}")
 
-    await db.disconnect()
     print(f"Saved {len(data)} records to database")
 
 
-async def scrape_kolscan():
+async def scrape_kolscan(save=True):
     logger = setup_logging()
     logger.info("Initializing scraper")
     
@@ -216,7 +214,8 @@ async def scrape_kolscan():
             except Exception as e:
                 logger.error(f"Failed to complete {period} scraping: {str(e)}", exc_info=True)
 
-        await save_to_database(all_data)  # Save combined data from all periods
+        if save:
+            await save_to_database(all_data)  # Save combined data from all periods
     
     except Exception as e:
         logger.error(f"Critical scraper error: {str(e)}", exc_info=True)
@@ -225,7 +224,9 @@ async def scrape_kolscan():
         driver.quit()
         logger.info("Scraping process completed, browser closed")
 
+    return all_data
+
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(scrape_kolscan())
+    asyncio.run(closing_db(scrape_kolscan()))
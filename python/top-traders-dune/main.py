@@ -1,6 +1,5 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from quart import Quart, request, jsonify
-from prisma import Prisma
 import asyncio
 import logging
 from quart_cors import cors
@@ -9,23 +8,33 @@ from dune_client.query import QueryBase
 from dune_client.types import QueryParameter
 import os
 from dotenv import load_dotenv
-import yaml
-from datetime import datetime
-from collections import defaultdict
-import socket
+from datetime import datetime, timedelta, timezone
 import time
-from kolscan_scraper import scrape_kolscan
-from gmgn_scraper import scrape_gmgn
-
-dune_request_queue = defaultdict(dict)  # Store query requests
-QUEUE_CHECK_INTERVAL = 60  # seconds
-
-class DuneRequest:
-    def __init__(self, query_id, params=None):
-        self.query_id = query_id
-        self.params = params
-        self.timestamp = time.time()
-        self.status = "queued"  # queued, processing, completed, failed
+from collections import defaultdict
+from bulk_upsert import bulk_upsert
+from shadow_tables import (
+    DIFF_SUFFIX, create_staging_table, drop_staging_table, load_staging_table, publish_staging_tables,
+)
+from dune_queue import DuneScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from dune_executor import DuneExecutor
+from pagination import list_response
+from response_cache import ResponseCache, cached_response
+from result_diff import (
+    hash_rows, content_hash, changed_rows, deleted_keys, get_query_state, save_query_state,
+    save_execution_id, apply_result_diff,
+)
+from ingest_pipeline import fetch_result_pages, convert_pages
+from query_registry import load_query_registry
+from scraper_worker import scrape_in_subprocess
+from wallet_profiles import PROFILE_SOURCES, TOP_TRADERS_TABLE, refresh_wallet_profiles, ensure_wallet_profiles
+from db_session import get_db, connect_db, disconnect_db
+from metrics import init_metrics, observe_db, DUNE_QUEUE_DEPTH, SCRAPER_DURATION
+from row_transforms import (
+    process_token_profitable_row,
+    process_holding_times_row,
+    convert_first_buy_wallet_rows,
+    convert_leaderboard_rows,
+)
 
 def handle_asyncio_exception(loop, context):
     # Don't log connection reset errors
@@ -47,254 +56,295 @@ asyncio.set_event_loop(loop)
 
 app = Quart(__name__)
 app = cors(app)
-prisma = Prisma()
+init_metrics(app)
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.', '.env')
 load_dotenv(dotenv_path)
+prisma = get_db()
 dune = DuneClient.from_env()
+dune_executor = DuneExecutor()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
+WALLET_PROFILE_TOP_TRADERS_MINUTES = int(os.getenv('WALLET_PROFILE_TOP_TRADERS_MINUTES', 60))
+SCHEDULE_RUN_AT_STARTUP = int(os.getenv('SCHEDULE_RUN_AT_STARTUP', 1))  # 0 waits a full interval before the first run
+SCHEDULE_STARTUP_STAGGER = int(os.getenv('SCHEDULE_STARTUP_STAGGER', 30))  # seconds between first runs after startup
 
 @app.before_serving
 async def startup():
-    await prisma.connect()
-    scheduler.add_job(scheduled_update, 'cron', hour='*/6', minute=0)  # Runs every 6 hours
+    await connect_db()
+    await ensure_wallet_profiles(prisma)
+    dune_scheduler.start()
+    # Each query refreshes on its own cadence from queries.yml. Every job also runs once
+    # shortly after startup, staggered so they don't all hit Dune at once; otherwise the
+    # first run would wait a full interval, a day for the daily queries, after each restart.
+    jobs = [
+        (scheduled_query_update, query.refresh_minutes, [query.id]) for query in query_registry.values()
+    ] + [
+        (scheduled_kol_update, scraper_config.get('refresh_minutes', 360), []),
+        (scheduled_top_traders_profile_update, WALLET_PROFILE_TOP_TRADERS_MINUTES, []),
+    ]
+    now = datetime.now()
+    for i, (job, minutes, args) in enumerate(jobs):
+        first_run = now + timedelta(seconds=i * SCHEDULE_STARTUP_STAGGER) if SCHEDULE_RUN_AT_STARTUP else now + timedelta(minutes=minutes)
+        scheduler.add_job(job, 'interval', minutes=minutes, args=args, next_run_time=first_run)
     scheduler.start()
-    asyncio.create_task(process_dune_queue())
 
 @app.after_serving
 async def shutdown():
     scheduler.shutdown()
-    await prisma.disconnect()
-
-async def process_dune_queue():
-    while True:
-        try:
-            # Create a safe copy of items to iterate
-            queue_items = [(query_id, dict(requests)) 
-                          for query_id, requests in dune_request_queue.items()]
-            
-            for query_id, requests in queue_items:
-                request_items = list(requests.items())
-                for key, request in request_items:
-                    if request.status == "queued":
-                        request.status = "processing"
-                        try:
-                            result = await run_dune_query(request.query_id, request.params)
-                            await store_dune_results(request.query_id, result, request.params)
-                            request.status = "completed"
-                            del dune_request_queue[query_id][key]
-                        except ConnectionResetError:
-                            logger.info("Client disconnected unexpectedly")
-                            continue
-                        except socket.error as e:
-                            logger.error(f"Socket error: {e}")
-                            request.status = "failed"
-                            del dune_request_queue[query_id][key]
-                        except Exception as e:
-                            logger.error(f"Error processing queue request: {str(e)}")
-                            request.status = "failed"
-                            del dune_request_queue[query_id][key]
-        except Exception as e:
-            logger.error(f"Queue processing error: {str(e)}")
-        await asyncio.sleep(QUEUE_CHECK_INTERVAL)
-
-def process_first_buy_wallet_row(row):
-    # Helper function to safely convert to float
-    def safe_float(value):
-        if value is None:
-            return 0.0
-        return float(value)
-    
-    # Helper function to safely parse datetime
-    def safe_datetime(value):
-        if value is None:
-            return datetime.now()
-        return datetime.strptime(value.split('.')[0], '%Y-%m-%d %H:%M:%S')
-    
-    return {
-        'token_mint_address': row['token_mint_address'],
-        'symbol': row['symbol'],
-        'token_launch_time': safe_datetime(row['token_launch_time']),
-        'trader_id': row['trader_id'],
-        'block_time': safe_datetime(row['block_time']),
-        'amount_usd': safe_float(row['amount_usd']),
-        'buyer_rank': int(row['buyer_rank']) if row['buyer_rank'] is not None else 0,
-        'buy_volume_1d': safe_float(row['buy_volume_1d']),
-        'sell_volume_1d': safe_float(row['sell_volume_1d']),
-        'total_pnl_1d': safe_float(row['total_pnl_1d']),
-        'total_trades_1d': safe_float(row['total_trades_1d']),
-        'buy_volume_7d': safe_float(row['buy_volume_7d']),
-        'sell_volume_7d': safe_float(row['sell_volume_7d']),
-        'total_pnl_7d': safe_float(row['total_pnl_7d']),
-        'total_trades_7d': safe_float(row['total_trades_7d']),
-        'buy_volume_30d': safe_float(row['buy_volume_30d']),
-        'sell_volume_30d': safe_float(row['sell_volume_30d']),
-        'total_pnl_30d': safe_float(row['total_pnl_30d']),
-        'total_trades_30d': safe_float(row['total_trades_30d']),
-        'shortest_hold_time': safe_float(row['shortest_hold_time']),
-        'longest_hold_time': safe_float(row['longest_hold_time']),
-        'average_hold_time': safe_float(row['average_hold_time']),
-        'shortest_hold_token': row['shortest_hold_token'],
-        'shortest_hold_symbol': row.get('shortest_hold_symbol', '') or '',
-        'longest_hold_token': row['longest_hold_token'],
-        'longest_hold_symbol': row.get('longest_hold_symbol', '') or '',
-        'last_updated': datetime.now().timestamp()
-    }
+    await dune_scheduler.stop()
+    dune_executor.shutdown()
+    await disconnect_db()
+
+async def execute_dune_request(request_info):
+    if not request_info.store:
+        # Background refreshes only resolve the latest execution; its rows are paged into the ingest
+        query = query_registry[request_info.query_id]
+        return await get_latest_execution(query.id, query.max_age_hours)
+    result = await run_dune_query(request_info.query_id, request_info.params)
+    await store_dune_results(request_info.query_id, result, request_info.params)
+    return result
+
+dune_scheduler = DuneScheduler(execute_dune_request)
+dune_request_queue = dune_scheduler.requests  # query_id -> key -> queued or running DuneRequest
+DUNE_QUEUE_DEPTH.set_function(
+    lambda: sum(r.status == "queued" for requests in dune_request_queue.values() for r in requests.values())
+)
+
+async def run_single_flight(query_id, key, params):
+    # Coalesce concurrent callers for the same query/params onto one Dune execution.
+    # Every waiter resumes as soon as the results are stored, or gets the same error.
+    # Shielded so a disconnecting client doesn't cancel the work for other waiters.
+    future = dune_scheduler.submit(query_id, key, params, priority=PRIORITY_INTERACTIVE)
+    await asyncio.shield(future)
+
+revalidating = set()  # queue keys with a background refresh in flight
+
+def revalidate_in_background(query_id, key, params):
+    # Queues a refresh nobody waits on. A blocking caller for the same key joins it
+    # (and bumps its priority); failures are only logged.
+    future = dune_scheduler.submit(query_id, key, params, priority=PRIORITY_BACKGROUND)
+    if key in revalidating:
+        return
+    revalidating.add(key)
 
-def process_token_profitable_row(row, token_mint_address):
-    return {
-        'token_mint_address': token_mint_address,
-        'trader_id': row['trader_id'],
-        'total_profit': float(row['total_profit']),
-        'total_buy_usd': float(row['total_buy_usd']),
-        'total_sell_usd': float(row['total_sell_usd']),
-        'total_trades': int(row['total_trades']),
-        'total_wins': int(row['total_wins']),
-        'total_losses': int(row['total_losses']),
-        'win_rate': float(row['win_rate']),
-        'avg_profit_per_trade': float(row['avg_profit_per_trade']),
-        'pnl_ratio': float(row['pnl_ratio']),
-        'last_updated': datetime.now().timestamp()
-    }
+    def done(future):
+        revalidating.discard(key)
+        if not future.cancelled() and future.exception():
+            logger.error(f"Background refresh {key} failed: {str(future.exception())}")
+    future.add_done_callback(done)
 
-def process_holding_times_row(row):
-    return {
-        'trader_id': row['trader_id'],
-        'shortest_hold_time': float(row['shortest_hold_time']),
-        'longest_hold_time': float(row['longest_hold_time']),
-        'average_hold_time': float(row['average_hold_time']),
-        'shortest_hold_token': row['shortest_hold_token'],
-        'shortest_hold_symbol': row.get('shortest_hold_symbol', '') or '',
-        'longest_hold_token': row['longest_hold_token'],
-        'longest_hold_symbol': row.get('longest_hold_symbol', '') or '',
-        'last_updated': datetime.now().timestamp()
-    }
+def stale_metadata(row, stale):
+    return {'stale': stale, 'last_updated': row.last_updated}
 
 async def store_dune_results(query_id, results, params=None):
     rows = results.result.rows
     if query_id == 4858794:  # First buy wallets
-        for row in rows:
-            processed_row = process_first_buy_wallet_row(row)
-            await prisma.earlytokenbuyers.upsert(
-                where={
-                    'token_mint_address_buyer_rank': {
-                        'token_mint_address': processed_row['token_mint_address'],
-                        'buyer_rank': processed_row['buyer_rank']
-                    }
-                },
-                data={
-                    'create': processed_row,
-                    'update': processed_row
-                }
-            )
+        processed_rows = convert_first_buy_wallet_rows(rows)
+        await bulk_upsert(prisma, 'EarlyTokenBuyers', processed_rows,
+                          ['token_mint_address', 'buyer_rank'])
     elif query_id == 4639226:  # Token profitable wallets
         token_mint_address = params[0].value
-        for row in rows:
-            processed_row = process_token_profitable_row(row, token_mint_address)
-            await prisma.tokenprofitablewallets.upsert(
-                where={
-                    'token_mint_address_trader_id': {
-                        'token_mint_address': processed_row['token_mint_address'],
-                        'trader_id': processed_row['trader_id']
-                    }
-                },
-                data={
-                    'create': processed_row,
-                    'update': processed_row
-                }
-            )
+        processed_rows = [process_token_profitable_row(row, token_mint_address) for row in rows]
+        await bulk_upsert(prisma, 'TokenProfitableWallets', processed_rows,
+                          ['token_mint_address', 'trader_id'])
     elif query_id == 4639965:  # Wallet holding times
-        for row in rows:
-            processed_row = process_holding_times_row(row)
-            await prisma.tokenholdingtimes.upsert(
-                where={
-                    'trader_id': processed_row['trader_id']
-                },
-                data={
-                    'create': processed_row,
-                    'update': processed_row
-                }
-            )
+        processed_rows = [process_holding_times_row(row) for row in rows]
+        await bulk_upsert(prisma, 'TokenHoldingTimes', processed_rows, ['trader_id'])
+        await refresh_wallet_profiles(prisma, 'TokenHoldingTimes', [row['trader_id'] for row in processed_rows])
+
+async def run_dune_query(query_id, params=None):
+    if params:
+        query = QueryBase(
+            name=f"Query {query_id}",
+            query_id=query_id,
+            params=params
+        )
+        return await dune_executor.call('run_query', dune.run_query, query)
+    return await dune_executor.call('get_latest_result', dune.get_latest_result, query_id, 24)
+
+async def get_latest_execution(query_id, max_age_hours=24):
+    # Fetches a single sample row, which is enough to learn the execution id.
+    # Dune re-runs the query first if its latest result is older than max_age_hours.
+    return await dune_executor.call(
+        'get_latest_result', lambda: dune.get_latest_result(query_id, max_age_hours, sample_count=1)
+    )
 
-async def run_dune_query(query_id, params=None, max_retries=3):
-    for attempt in range(max_retries):
+def iter_result_rows(execution, convert):
+    return convert_pages(fetch_result_pages(dune_executor, dune, execution.execution_id), convert)
+
+TRANSFORMS = {
+    'leaderboard': convert_leaderboard_rows,
+}
+query_registry, scraper_config = load_query_registry(
+    os.path.join(os.path.dirname(__file__), '.', 'queries.yml'), TRANSFORMS
+)
+# One refresh per query (and one for the KOL scrapes) at a time, since they share staging tables
+refresh_locks = defaultdict(asyncio.Lock)
+response_cache = ResponseCache()
+
+def process_kol_rows(records):
+    updated_at = datetime.now(timezone.utc)
+    return [{**record, 'updatedAt': updated_at} for record in records]
+
+async def ingest_swap_result(query, execution, full_reload=False, address_column=None):
+    # Rows are paged in from Dune and only one page is held at a time, plus the per-row
+    # hashes. Without a previous state each page is written to a staging table that is
+    # swapped in at the end. With one, each page's new or changed rows are written to a
+    # diff table as they arrive; nothing is applied if the content hash matches the previous
+    # result, otherwise the diff table, the deletions and the new state commit in one transaction.
+    # Returns the address_column values of the changed and deleted rows, or None when the
+    # table was reloaded as a whole.
+    state = None if full_reload else await get_query_state(prisma, query.id)
+    if state and state.execution_id == execution.execution_id:
+        logger.info(f"Query {query.id} execution {execution.execution_id} already ingested, skipping")
+        return set()
+
+    target = None if state else await create_staging_table(prisma, query.table)
+    diff_table = None
+    columns = None
+    changed_count = 0
+    row_hashes = {}
+    addresses = set()
+    try:
+        async for rows in iter_result_rows(execution, query.transform):
+            page_hashes = hash_rows(rows, query.unique_key)
+            row_hashes.update(page_hashes)
+            if not state:
+                await bulk_upsert(prisma, target, rows, query.unique_key)
+                continue
+            changed = changed_rows(rows, query.unique_key, page_hashes, state.row_hashes)
+            if changed:
+                diff_table = diff_table or await create_staging_table(prisma, query.table, DIFF_SUFFIX)
+                columns = list(changed[0].keys())
+                await bulk_upsert(prisma, diff_table, changed, query.unique_key)
+                changed_count += len(changed)
+                if address_column:
+                    addresses.update(row[address_column] for row in changed)
+
+        # Keep serving the previous leaderboard if a query came back empty
+        if not row_hashes:
+            if not state:
+                await drop_staging_table(prisma, query.table)
+            return set()
+
+        result_hash = content_hash(row_hashes)
+        if not state:
+            await publish_staging_tables(prisma, [query.table])
+            await save_query_state(prisma, query.id, execution.execution_id, result_hash, row_hashes)
+            return None
+        if result_hash == state.content_hash:
+            logger.info(f"Query {query.id} result unchanged")
+            await save_execution_id(prisma, query.id, execution.execution_id)
+            return set()
+        deleted = deleted_keys(row_hashes, state.row_hashes)
+        await apply_result_diff(prisma, query.id, query.table, diff_table, columns, query.unique_key,
+                                changed_count, deleted, execution.execution_id, result_hash, row_hashes)
+        if address_column:
+            position = query.unique_key.index(address_column)
+            addresses.update(key[position] for key in deleted)
+        return addresses
+    finally:
+        if diff_table:
+            await drop_staging_table(prisma, query.table, DIFF_SUFFIX)
+
+async def refresh_query(query, full_reload=False):
+    async with refresh_locks[query.id]:
+        try:
+            start = time.perf_counter()
+            execution = await dune_scheduler.submit(
+                query.id, f"latest_{query.id}", priority=PRIORITY_BACKGROUND, store=False
+            )
+            dune_time = time.perf_counter() - start
+            # A diff only touches the profiles of the wallets it changed or deleted; upserts
+            # and staging reloads rebuild the whole section
+            addresses = None
+            address_column = PROFILE_SOURCES[query.table][1] if query.table in PROFILE_SOURCES else None
+            if query.mode == 'upsert':
+                async for rows in iter_result_rows(execution, query.transform):
+                    await bulk_upsert(prisma, query.table, rows, query.unique_key)
+            else:
+                tracked = address_column if address_column in query.unique_key else None
+                addresses = await ingest_swap_result(query, execution, full_reload, tracked)
+                if not tracked:
+                    addresses = None
+            if address_column:
+                await refresh_wallet_profiles(prisma, query.table, addresses)
+            logger.info(f"Query {query.id} refreshed: dune {dune_time:.2f}s, ingest {time.perf_counter() - start - dune_time:.2f}s")
+        finally:
+            # Leaderboard responses are only valid until the next ingest, including
+            # a partial one that applied some rows before failing
+            response_cache.invalidate()
+
+async def scrape_and_stage(table, scraper):
+    start = time.perf_counter()
+    records = await scrape_in_subprocess(scraper)
+    scrape_time = time.perf_counter() - start
+    SCRAPER_DURATION.labels(scraper).observe(scrape_time)
+    # Keep serving the previous leaderboard if a scrape came back empty
+    if records:
+        await load_staging_table(prisma, table, process_kol_rows(records), [])
+    logger.info(f"Scraped {len(records)} {table} records: scrape {scrape_time:.2f}s, load {time.perf_counter() - start - scrape_time:.2f}s")
+    return table if records else None
+
+async def refresh_kol_leaderboards():
+    async with refresh_locks['kol']:
         try:
-            # Get the current event loop
-            loop = asyncio.get_event_loop()
-            
-            # Use run_in_executor instead of to_thread
-            if params:
-                query = QueryBase(
-                    name=f"Query {query_id}",
-                    query_id=query_id,
-                    params=params
-                )
-                return await asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: dune.run_query(query)),
-                    timeout=600
-                )
-            return await asyncio.wait_for(
-                loop.run_in_executor(None, lambda: dune.get_latest_result(query_id, 24)),
-                timeout=600
+            staged_tables = await asyncio.gather(
+                scrape_and_stage('kol_leaderboard', 'kolscan'),
+                scrape_and_stage('gmgn_kol', 'gmgn')
             )
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise
-            await asyncio.sleep(2 ** attempt)
+            published = [table for table in staged_tables if table]
+            await publish_staging_tables(prisma, published)
+            for table in published:
+                await refresh_wallet_profiles(prisma, table)
+        finally:
+            response_cache.invalidate()
 
-async def scheduled_update():
-    logger.info("Starting scheduled data update")
+async def timed_stage(name, coro):
+    start = time.perf_counter()
     try:
-        # Clear all tables first
-        await prisma.mostprofitablewallets.delete_many()
-        await prisma.mostprofitablewalletstx.delete_many()
-        await prisma.highactivitywalletsbyvolume.delete_many()
-        await prisma.highactivitywalletsbytransactions.delete_many()
-        # await prisma.earlytokenbuyers.delete_many()
-        await prisma.tokendeployersuccess.delete_many()
-        await prisma.kolleaderboard.delete_many()
-        await prisma.gmgnkol.delete_many()
-
-        queries_yml = os.path.join(os.path.dirname(__file__), '.', 'queries.yml')
-        with open(queries_yml, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
-
-        query_ids = [id for id in data['query_ids']]
-
-        results = await asyncio.gather(*[run_dune_query(id) for id in query_ids])
-
-        for id, query_result in zip(query_ids, results):
-            rows = query_result.result.rows
-            for row in rows:
-                if 'last_trade_time' in row:
-                    row['last_trade_time'] = datetime.strptime(
-                        row['last_trade_time'].split('.')[0], 
-                        '%Y-%m-%d %H:%M:%S'
-                    )
-                if id == 4631759:
-                    await prisma.earlytokenbuyers.create(data=row)
-                elif id == 4629656:
-                    await prisma.highactivitywalletsbyvolume.create(data=row)
-                elif id == 4629687:
-                    await prisma.highactivitywalletsbytransactions.create(data=row)
-                elif id == 4629509:
-                    await prisma.mostprofitablewallets.create(data=row)
-                elif id == 4683382:
-                    await prisma.mostprofitablewalletstx.create(data=row)
-                elif id == 4656172:
-                    row['created_at'] = datetime.strptime(row['created_at'].split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    row['token_launch_time'] = datetime.strptime(row['token_launch_time'].split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    await prisma.tokendeployersuccess.create(data=row)
-
-        await scrape_kolscan()
-        await scrape_gmgn()
-
-        logger.info("Scheduled data update completed successfully")
+        return await coro
+    finally:
+        logger.info(f"Refresh stage '{name}' finished after {time.perf_counter() - start:.2f}s")
+
+async def refresh_data(full_reload=False):
+    # Every query is ingested as soon as its own Dune result arrives, and the KOL
+    # scrapes run alongside; the slowest stage is the refresh's critical path
+    start = time.perf_counter()
+    stages = [timed_stage(f"query {query.id}", refresh_query(query, full_reload)) for query in query_registry.values()]
+    stages.append(timed_stage('kol leaderboards', refresh_kol_leaderboards()))
+    results = await asyncio.gather(*stages, return_exceptions=True)
+    logger.info(f"Refresh finished in {time.perf_counter() - start:.2f}s")
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
+async def scheduled_query_update(query_id):
+    logger.info(f"Starting scheduled update of query {query_id}")
+    try:
+        await refresh_query(query_registry[query_id])
+        logger.info(f"Scheduled update of query {query_id} completed successfully")
     except Exception as e:
-        logger.error(f"Error in scheduled update: {str(e)}")
+        logger.error(f"Error in scheduled update of query {query_id}: {str(e)}")
+
+async def scheduled_top_traders_profile_update():
+    # top_traders is written by the dexscreener service, so its section is rebuilt on a timer
+    try:
+        await refresh_wallet_profiles(prisma, TOP_TRADERS_TABLE)
+    except Exception as e:
+        logger.error(f"Error refreshing wallet profiles from {TOP_TRADERS_TABLE}: {str(e)}")
+
+async def scheduled_kol_update():
+    logger.info("Starting scheduled KOL leaderboard update")
+    try:
+        await refresh_kol_leaderboards()
+        logger.info("Scheduled KOL leaderboard update completed successfully")
+    except Exception as e:
+        logger.error(f"Error in scheduled KOL leaderboard update: {str(e)}")
 
 def format_wallet_data(wallet):
     return {
@@ -333,50 +383,31 @@ async def get_first_buy_wallets():
     if not token_mint_address:
         return jsonify({'error': 'token_mint_address parameter is required'}), 400
 
-    existing_results = await prisma.earlytokenbuyers.find_many(
-        where={
-            'token_mint_address': token_mint_address
-        }
-    )
+    with observe_db('find_many', 'earlytokenbuyers'):
+        existing_results = await prisma.earlytokenbuyers.find_many(
+            where={
+                'token_mint_address': token_mint_address
+            }
+        )
 
     if existing_results:
         if len(existing_results) >= 10 or (existing_results[-1].last_updated - existing_results[-1].token_launch_time.timestamp()) > 600:
             return jsonify({'wallets': [format_wallet_data(w) for w in existing_results]})
 
     queue_key = f"first_buy_{token_mint_address}"
-    request_info = dune_request_queue[4858794].get(queue_key)
-
-    if request_info and request_info.status == "processing":
-        # Wait for the processing request to complete
-        while request_info.status == "processing":
-            await asyncio.sleep(1)
-    elif not request_info:
-        # Add new request to queue and process it
-        params = [QueryParameter.text_type(name="token_mint_address", value=token_mint_address)]
-        dune_request_queue[4858794][queue_key] = DuneRequest(4858794, params)
-        request_info = dune_request_queue[4858794][queue_key]
-        
-        # Process the request
-        request_info.status = "processing"
-        try:
-            results = await run_dune_query(4858794, params)
-            await store_dune_results(4858794, results, params)
-            request_info.status = "completed"
-        except Exception as e:
-            request_info.status = "failed"
-            raise e
-        finally:
-            del dune_request_queue[4858794][queue_key]
+    params = [QueryParameter.text_type(name="token_mint_address", value=token_mint_address)]
+    await run_single_flight(4858794, queue_key, params)
 
     # Return the updated results
-    final_results = await prisma.earlytokenbuyers.find_many(
-        where={
-            'token_mint_address': token_mint_address
-        },
-        order={
-            'buyer_rank': 'asc'
-        }
-    )
+    with observe_db('find_many', 'earlytokenbuyers'):
+        final_results = await prisma.earlytokenbuyers.find_many(
+            where={
+                'token_mint_address': token_mint_address
+            },
+            order={
+                'buyer_rank': 'asc'
+            }
+        )
     
     return jsonify({'wallets': [format_wallet_data(w) for w in final_results]})
 
@@ -402,74 +433,48 @@ async def get_token_profitable_wallets():
     if not token_mint_address:
         return jsonify({'error': 'token_mint_address parameter is required'}), 400
 
-    existing_results = await prisma.tokenprofitablewallets.find_many(
-        where={
-            'token_mint_address': token_mint_address,
-            'last_updated': {
-                'gte': datetime.now().timestamp() - (24 * 60 * 60)
-            }
-        },
-        order={
-            'total_profit': 'desc'
+    fresh_where = {
+        'token_mint_address': token_mint_address,
+        'last_updated': {
+            'gte': datetime.now().timestamp() - (24 * 60 * 60)
         }
-    )
-
-    if existing_results:
-        return jsonify({'wallets': [format_profitable_wallet(w) for w in existing_results]})
+    }
+    # allow_stale=1 answers from rows older than 24h right away and refreshes them in the background
+    allow_stale = request.args.get('allow_stale') == '1'
+    with observe_db('find_first', 'tokenprofitablewallets'):
+        fresh = await prisma.tokenprofitablewallets.find_first(where=fresh_where)
+    if fresh:
+        return await list_response(
+            prisma.tokenprofitablewallets, fresh_where, 'total_profit', format_profitable_wallet,
+            meta=stale_metadata(fresh, False) if allow_stale else None
+        )
 
     queue_key = f"token_profitable_{token_mint_address}"
-    request_info = dune_request_queue[4639226].get(queue_key)
-
-    if request_info and request_info.status == "processing":
-        while request_info.status == "processing":
-            await asyncio.sleep(1)
-    elif not request_info:
-        params = [QueryParameter.text_type(name="token_mint_address", value=token_mint_address)]
-        dune_request_queue[4639226][queue_key] = DuneRequest(4639226, params)
-        request_info = dune_request_queue[4639226][queue_key]
-        
-        request_info.status = "processing"
-        try:
-            results = await run_dune_query(4639226, params)
-            await store_dune_results(4639226, results, params)
-            request_info.status = "completed"
-        except Exception as e:
-            request_info.status = "failed"
-            raise e
-        finally:
-            del dune_request_queue[4639226][queue_key]
-
-    final_results = await prisma.tokenprofitablewallets.find_many(
-        where={
-            'token_mint_address': token_mint_address
-        },
-        order={
-            'total_profit': 'desc'
-        }
-    )
-    
-    return jsonify({'wallets': [format_profitable_wallet(w) for w in final_results]})
+    params = [QueryParameter.text_type(name="token_mint_address", value=token_mint_address)]
+    if allow_stale:
+        with observe_db('find_first', 'tokenprofitablewallets'):
+            latest = await prisma.tokenprofitablewallets.find_first(
+                where={'token_mint_address': token_mint_address},
+                order={'last_updated': 'desc'}
+            )
+        if latest:
+            revalidate_in_background(4639226, queue_key, params)
+            return await list_response(
+                prisma.tokenprofitablewallets, {'token_mint_address': token_mint_address},
+                'total_profit', format_profitable_wallet, meta=stale_metadata(latest, True)
+            )
 
-@app.route('/api/profitable-wallets', methods=['GET'])
-async def get_profitable_wallets():
-    period = request.args.get('period', '30')
-    try:
-        period = int(period)
-        if period not in [1, 7, 30]:
-            return jsonify({'error': 'Period must be 1, 7, or 30'}), 400
-    except ValueError:
-        return jsonify({'error': 'Invalid period value'}), 400
+    await run_single_flight(4639226, queue_key, params)
 
-    wallets = await prisma.mostprofitablewallets.find_many(
-        where={
-            'period': period
-        },
-        order={
-            'total_profit': 'desc'
-        }
+    return await list_response(
+        prisma.tokenprofitablewallets,
+        {'token_mint_address': token_mint_address},
+        'total_profit',
+        format_profitable_wallet
     )
-    
-    wallets_dict = [{
+
+def format_most_profitable_wallet(w):
+    return {
         'trader_id': w.trader_id,
         'total_profit': w.total_profit,
         'total_buy_usd': w.total_buy_usd,
@@ -479,37 +484,10 @@ async def get_profitable_wallets():
         'total_losses': w.total_losses,
         'win_rate': w.win_rate,
         'pnl_ratio': w.pnl_ratio,
-    } for w in wallets]
-    return jsonify({'wallets': wallets_dict})
-
-@app.route('/api/profitable-wallets-tx', methods=['GET'])
-async def get_profitable_wallets_tx():
-    period = request.args.get('period', '30')
-    tx_min = request.args.get('tx_min', 0)
-    tx_max = request.args.get('tx_max', 100)
-    try:
-        period = int(period)
-        if period not in [1, 7, 30]:
-            return jsonify({'error': 'Period must be 1, 7, or 30'}), 400
-        tx_min = int(tx_min)
-        tx_max = int(tx_max)
-    except ValueError:
-        return jsonify({'error': 'Invalid parameter'}), 400
-
-    wallets = await prisma.mostprofitablewalletstx.find_many(
-        where={
-            'period': period,
-            'total_transaction_count': {
-                'gte': tx_min,
-                'lte': tx_max
-            }
-        },
-        order={
-            'total_profit': 'desc'
-        }
-    )
+    }
 
-    wallets_dict = [{
+def format_most_profitable_wallet_tx(w):
+    return {
         'trader_id': w.trader_id,
         'total_transaction_count': w.total_transaction_count,
         'total_profit': w.total_profit,
@@ -525,10 +503,66 @@ async def get_profitable_wallets_tx():
         'total_volume_traded': w.total_volume_traded,
         'pnl_ratio': w.pnl_ratio,
         'last_trade_time': w.last_trade_time
-    } for w in wallets]
-    return jsonify({'wallets': wallets_dict})
+    }
+
+def format_high_volume_wallet(w):
+    return {
+        'trader_id': w.trader_id,
+        'total_volume_usd': w.total_volume_usd,
+        'total_trades': w.total_trades,
+        'avg_trade_size_usd': w.avg_trade_size_usd,
+        'last_trade_time': w.last_trade_time
+    }
+
+def format_high_transaction_wallet(w):
+    return {
+        'trader_id': w.trader_id,
+        'total_transactions': w.total_transactions,
+        'avg_daily_transactions': w.avg_daily_transactions,
+        'total_volume_usd': w.total_volume_usd,
+        'avg_trade_size_usd': w.avg_trade_size_usd,
+        'last_trade_time': w.last_trade_time
+    }
+
+@app.route('/api/profitable-wallets', methods=['GET'])
+@cached_response(response_cache)
+async def get_profitable_wallets():
+    period = request.args.get('period', '30')
+    try:
+        period = int(period)
+        if period not in [1, 7, 30]:
+            return jsonify({'error': 'Period must be 1, 7, or 30'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid period value'}), 400
+
+    return await list_response(prisma.mostprofitablewallets, {'period': period}, 'total_profit', format_most_profitable_wallet)
+
+@app.route('/api/profitable-wallets-tx', methods=['GET'])
+@cached_response(response_cache)
+async def get_profitable_wallets_tx():
+    period = request.args.get('period', '30')
+    tx_min = request.args.get('tx_min', 0)
+    tx_max = request.args.get('tx_max', 100)
+    try:
+        period = int(period)
+        if period not in [1, 7, 30]:
+            return jsonify({'error': 'Period must be 1, 7, or 30'}), 400
+        tx_min = int(tx_min)
+        tx_max = int(tx_max)
+    except ValueError:
+        return jsonify({'error': 'Invalid parameter'}), 400
+
+    where = {
+        'period': period,
+        'total_transaction_count': {
+            'gte': tx_min,
+            'lte': tx_max
+        }
+    }
+    return await list_response(prisma.mostprofitablewalletstx, where, 'total_profit', format_most_profitable_wallet_tx)
 
 @app.route('/api/high-volume-wallets', methods=['GET'])
+@cached_response(response_cache)
 async def get_high_volume_wallets():
     days = request.args.get('period', '30')
     try:
@@ -538,25 +572,10 @@ async def get_high_volume_wallets():
     except ValueError:
         return jsonify({'error': 'Invalid period value'}), 400
 
-    wallets = await prisma.highactivitywalletsbyvolume.find_many(
-        where={
-            'days': days
-        },
-        order={
-            'total_volume_usd': 'desc'
-        }
-    )
-    
-    wallets_dict = [{
-        'trader_id': w.trader_id,
-        'total_volume_usd': w.total_volume_usd,
-        'total_trades': w.total_trades,
-        'avg_trade_size_usd': w.avg_trade_size_usd,
-        'last_trade_time': w.last_trade_time
-    } for w in wallets]
-    return jsonify({'wallets': wallets_dict})
+    return await list_response(prisma.highactivitywalletsbyvolume, {'days': days}, 'total_volume_usd', format_high_volume_wallet)
 
 @app.route('/api/high-transaction-wallets', methods=['GET'])
+@cached_response(response_cache)
 async def get_high_transaction_wallets():
     days = request.args.get('period', '30')
     try:
@@ -566,24 +585,7 @@ async def get_high_transaction_wallets():
     except ValueError:
         return jsonify({'error': 'Invalid period value'}), 400
 
-    wallets = await prisma.highactivitywalletsbytransactions.find_many(
-        where={
-            'days': days
-        },
-        order={
-            'total_transactions': 'desc'
-        }
-    )
-    
-    wallets_dict = [{
-        'trader_id': w.trader_id,
-        'total_transactions': w.total_transactions,
-        'avg_daily_transactions': w.avg_daily_transactions,
-        'total_volume_usd': w.total_volume_usd,
-        'avg_trade_size_usd': w.avg_trade_size_usd,
-        'last_trade_time': w.last_trade_time
-    } for w in wallets]
-    return jsonify({'wallets': wallets_dict})
+    return await list_response(prisma.highactivitywalletsbytransactions, {'days': days}, 'total_transactions', format_high_transaction_wallet)
 
 def format_holding_times(data):
     return {
@@ -604,49 +606,170 @@ async def get_wallet_holding_times():
     if not trader_id:
         return jsonify({'error': 'trader_id parameter is required'}), 400
 
-    existing_result = await prisma.tokenholdingtimes.find_first(
-        where={
-            'trader_id': trader_id,
-            'last_updated': {
-                'gte': datetime.now().timestamp() - (24 * 60 * 60)
+    # allow_stale=1 answers from a row older than 24h right away and refreshes it in the background
+    allow_stale = request.args.get('allow_stale') == '1'
+    with observe_db('find_first', 'tokenholdingtimes'):
+        existing_result = await prisma.tokenholdingtimes.find_first(
+            where={
+                'trader_id': trader_id
             }
-        }
-    )
+        )
 
-    if existing_result:
+    fresh = existing_result and existing_result.last_updated >= datetime.now().timestamp() - (24 * 60 * 60)
+    if fresh:
+        if allow_stale:
+            return jsonify({**format_holding_times(existing_result), **stale_metadata(existing_result, False)})
         return jsonify(format_holding_times(existing_result))
 
     queue_key = f"holding_times_{trader_id}"
-    request_info = dune_request_queue[4639965].get(queue_key)
-
-    if request_info and request_info.status == "processing":
-        while request_info.status == "processing":
-            await asyncio.sleep(1)
-    elif not request_info:
-        params = [QueryParameter.text_type(name="trader_id", value=trader_id)]
-        dune_request_queue[4639965][queue_key] = DuneRequest(4639965, params)
-        request_info = dune_request_queue[4639965][queue_key]
-        
-        request_info.status = "processing"
-        try:
-            results = await run_dune_query(4639965, params)
-            await store_dune_results(4639965, results, params)
-            request_info.status = "completed"
-        except Exception as e:
-            request_info.status = "failed"
-            raise e
-        finally:
-            del dune_request_queue[4639965][queue_key]
+    params = [QueryParameter.text_type(name="trader_id", value=trader_id)]
+    if allow_stale and existing_result:
+        revalidate_in_background(4639965, queue_key, params)
+        return jsonify({**format_holding_times(existing_result), **stale_metadata(existing_result, True)})
 
-    final_result = await prisma.tokenholdingtimes.find_first(
-        where={
-            'trader_id': trader_id
-        }
-    )
+    await run_single_flight(4639965, queue_key, params)
+
+    with observe_db('find_first', 'tokenholdingtimes'):
+        final_result = await prisma.tokenholdingtimes.find_first(
+            where={
+                'trader_id': trader_id
+            }
+        )
     
     return jsonify(format_holding_times(final_result))
 
+MAX_BATCH_WALLETS = int(os.getenv('MAX_BATCH_WALLETS', 200))
+BATCH_WAIT_WALLETS = int(os.getenv('BATCH_WAIT_WALLETS', 10))  # wallets without holding times a batch request waits on Dune for
+HOLDING_TIMES_LIST_MODE = int(os.getenv('HOLDING_TIMES_LIST_MODE', 0))  # 1 once query 4639965 takes a trader_id list
+HOLDING_TIMES_BATCH_SIZE = int(os.getenv('HOLDING_TIMES_BATCH_SIZE', 50))  # trader ids per Dune execution in list mode
+
+async def find_holding_times(trader_ids):
+    with observe_db('find_many', 'tokenholdingtimes'):
+        rows = await prisma.tokenholdingtimes.find_many(where={'trader_id': {'in': trader_ids}})
+    return {row.trader_id: row for row in rows}
+
+def holding_times_requests(trader_ids):
+    # (trader ids, queue key, params) of the query 4639965 executions covering trader_ids: one
+    # per wallet, or one per HOLDING_TIMES_BATCH_SIZE wallets when HOLDING_TIMES_LIST_MODE says
+    # the saved query takes a comma separated trader_id list (see the ReadMe). A single wallet
+    # gets the /api/wallet-holding-times queue key, so it coalesces with single lookups.
+    size = HOLDING_TIMES_BATCH_SIZE if HOLDING_TIMES_LIST_MODE else 1
+    requests = []
+    for i in range(0, len(trader_ids), size):
+        chunk = trader_ids[i:i + size]
+        value = ','.join(chunk)
+        requests.append((chunk, f"holding_times_{value}", [QueryParameter.text_type(name="trader_id", value=value)]))
+    return requests
+
+def revalidate_holding_times(trader_ids):
+    for _, key, params in holding_times_requests(trader_ids):
+        revalidate_in_background(4639965, key, params)
+
+async def refresh_holding_times(trader_ids):
+    # Waits for the executions covering trader_ids and returns the refreshed rows, the ids
+    # whose execution failed and the ids queued for a background refresh. In list mode,
+    # wallets a grouped execution did not return are queued one at a time, so a query that
+    # still takes a single id fills them in later instead of leaving them empty.
+    started = datetime.now().timestamp()
+    requests = holding_times_requests(trader_ids)
+    results = await asyncio.gather(
+        *(run_single_flight(4639965, key, params) for _, key, params in requests),
+        return_exceptions=True
+    )
+    failed = set()
+    for (chunk, key, _), result in zip(requests, results):
+        if isinstance(result, Exception):
+            logger.error(f"Holding times refresh {key} failed: {str(result)}")
+            failed.update(chunk)
+
+    refreshed = await find_holding_times(trader_ids)
+    missed = set()
+    if HOLDING_TIMES_LIST_MODE and len(trader_ids) > 1:
+        missed = {
+            t for t in trader_ids
+            if t not in failed and (t not in refreshed or refreshed[t].last_updated < started)
+        }
+        if missed:
+            logger.warning(f"Grouped holding times executions missed {len(missed)} of {len(trader_ids)} wallets, queueing them one at a time")
+            for trader_id in sorted(missed):
+                revalidate_holding_times([trader_id])
+    return refreshed, failed, missed
+
+@app.route('/api/wallets/batch', methods=['POST'])
+async def get_wallets_batch():
+    data = await request.get_json(silent=True) or {}
+    trader_ids = data.get('trader_ids')
+    if not isinstance(trader_ids, list) or not trader_ids or not all(isinstance(t, str) and t for t in trader_ids):
+        return jsonify({'error': 'trader_ids must be a non-empty list of wallet addresses'}), 400
+    trader_ids = list(dict.fromkeys(trader_ids))
+    if len(trader_ids) > MAX_BATCH_WALLETS:
+        return jsonify({'error': f'At most {MAX_BATCH_WALLETS} trader_ids per request'}), 400
+
+    # Stale holding times are returned as they are and refreshed in the background. Only
+    # wallets without any row are waited on, at most BATCH_WAIT_WALLETS of them per request;
+    # the rest are queued like the stale ones.
+    holding_times = await find_holding_times(trader_ids)
+    fresh_after = datetime.now().timestamp() - (24 * 60 * 60)
+    missing = [t for t in trader_ids if t not in holding_times]
+    waiting = missing[:BATCH_WAIT_WALLETS]
+    pending = set(missing[BATCH_WAIT_WALLETS:]) | {
+        t for t, row in holding_times.items() if row.last_updated < fresh_after
+    }
+    if pending:
+        revalidate_holding_times(sorted(pending))
+    failed = set()
+    if waiting:
+        refreshed, failed, missed = await refresh_holding_times(waiting)
+        holding_times.update(refreshed)
+        pending |= missed
+
+    with observe_db('find_many', 'mostprofitablewallets'):
+        profitable = await prisma.mostprofitablewallets.find_many(
+            where={'trader_id': {'in': trader_ids}},
+            order={'period': 'asc'}
+        )
+    profitability = defaultdict(list)
+    for row in profitable:
+        profitability[row.trader_id].append({**format_most_profitable_wallet(row), 'period': row.period})
+
+    def batch_holding_times(trader_id):
+        row = holding_times.get(trader_id)
+        if not row:
+            return None
+        return {**format_holding_times(row), **stale_metadata(row, row.last_updated < fresh_after)}
+
+    return jsonify({'wallets': [{
+        'trader_id': trader_id,
+        'holding_times': batch_holding_times(trader_id),
+        'holding_times_pending': trader_id in pending,
+        'holding_times_failed': trader_id in failed,
+        'profitability': profitability[trader_id]
+    } for trader_id in trader_ids]})
+
+def format_wallet_profile(profile):
+    return {
+        'address': profile.address,
+        'most_profitable': profile.most_profitable or [],
+        'most_profitable_tx': profile.most_profitable_tx or [],
+        'high_volume': profile.high_volume or [],
+        'high_transactions': profile.high_transactions or [],
+        'kol_leaderboard': profile.kol_leaderboard or [],
+        'gmgn_kol': profile.gmgn_kol or [],
+        'holding_times': profile.holding_times[0] if profile.holding_times else None,
+        'top_traders': profile.top_traders or [],
+        'updated_at': profile.updatedAt
+    }
+
+@app.route('/api/wallets/<address>', methods=['GET'])
+async def get_wallet_profile(address):
+    with observe_db('find_unique', 'walletprofile'):
+        profile = await prisma.walletprofile.find_unique(where={'address': address})
+    if not profile:
+        return jsonify({'error': 'Wallet not found'}), 404
+    return jsonify(format_wallet_profile(profile))
+
 @app.route('/api/successful-token-deployers', methods=['GET'])
+@cached_response(response_cache)
 async def get_successful_token_deployers():
     period = request.args.get('period', '30')
     try:
@@ -656,14 +779,15 @@ async def get_successful_token_deployers():
     except ValueError:
         return jsonify({'error': 'Invalid period value'}), 400
 
-    tokens = await prisma.tokendeployersuccess.find_many(
-        where={
-            'period_days': period
-        },
-        order={
-            'max_market_cap': 'desc'
-        }
-    )
+    with observe_db('find_many', 'tokendeployersuccess'):
+        tokens = await prisma.tokendeployersuccess.find_many(
+            where={
+                'period_days': period
+            },
+            order={
+                'max_market_cap': 'desc'
+            }
+        )
     
     tokens_dict = [{
         'token_mint_address': t.token_mint_address,
@@ -684,6 +808,7 @@ async def get_successful_token_deployers():
     return jsonify({'tokens': tokens_dict})
 
 @app.route('/api/kol-leaderboard', methods=['GET'])
+@cached_response(response_cache)
 async def get_kol_leaderboard():
     period = request.args.get('period', '1')
     wallet_name = request.args.get('wallet_name')
@@ -703,12 +828,13 @@ async def get_kol_leaderboard():
     if wallet_address:
         where_clause['wallet_address'] = wallet_address
 
-    results = await prisma.kolleaderboard.find_many(
-        where=where_clause,
-        order={
-            'pnl_usd': 'desc'
-        }
-    )
+    with observe_db('find_many', 'kolleaderboard'):
+        results = await prisma.kolleaderboard.find_many(
+            where=where_clause,
+            order={
+                'pnl_usd': 'desc'
+            }
+        )
     
     leaderboard = [{
         'wallet_name': entry.wallet_name,
@@ -722,6 +848,7 @@ async def get_kol_leaderboard():
     return jsonify({'leaderboard': leaderboard})
 
 @app.route('/api/gmgn-kol', methods=['GET'])
+@cached_response(response_cache)
 async def get_gmgn_kol():
     period = request.args.get('period', '1')
     wallet_name = request.args.get('wallet_name')
@@ -741,12 +868,13 @@ async def get_gmgn_kol():
     if wallet_address:
         where_clause['wallet_address'] = wallet_address
 
-    results = await prisma.gmgnkol.find_many(
-        where=where_clause,
-        order={
-            'pnl_usd': 'desc'
-        }
-    )
+    with observe_db('find_many', 'gmgnkol'):
+        results = await prisma.gmgnkol.find_many(
+            where=where_clause,
+            order={
+                'pnl_usd': 'desc'
+            }
+        )
     
     leaderboard = [{
         'wallet_name': entry.wallet_name,
@@ -758,66 +886,16 @@ async def get_gmgn_kol():
 
     return jsonify({'leaderboard': leaderboard})
 
+@app.route('/api/dune-queue', methods=['GET'])
+async def get_dune_queue():
+    return jsonify({**dune_scheduler.stats(), 'executor': dune_executor.stats()})
+
 @app.route('/api/update-data', methods=['POST'])
 async def update_data():
+    # full=1 reloads every leaderboard table instead of applying only what changed
+    full_reload = request.args.get('full', '0') == '1'
     try:
-        # Clear all tables first
-        await prisma.mostprofitablewallets.delete_many()
-        await prisma.mostprofitablewalletstx.delete_many()
-        await prisma.highactivitywalletsbyvolume.delete_many()
-        await prisma.highactivitywalletsbytransactions.delete_many()
-        # await prisma.earlytokenbuyers.delete_many()
-        await prisma.tokendeployersuccess.delete_many()
-        await prisma.kolleaderboard.delete_many()
-        await prisma.gmgnkol.delete_many()
-
-        queries_yml = os.path.join(os.path.dirname(__file__), '.', 'queries.yml')
-        with open(queries_yml, 'r', encoding='utf-8') as file:
-            data = yaml.safe_load(file)
-
-        query_ids = [id for id in data['query_ids']]
-
-        results = await asyncio.gather(*[run_dune_query(id) for id in query_ids])
-        
-        for id, query_result in zip(query_ids, results):
-            rows = query_result.result.rows
-            for row in rows:
-                if 'last_trade_time' in row:
-                    row['last_trade_time'] = datetime.strptime(
-                        row['last_trade_time'].split('.')[0], 
-                        '%Y-%m-%d %H:%M:%S'
-                    )
-                if id == 4631759:  # Early Token Buyers
-                    await prisma.earlytokenbuyers.create(
-                        data=row
-                    )
-                elif id == 4629656:  # High Activity by Volume
-                    await prisma.highactivitywalletsbyvolume.create(
-                        data=row
-                    )
-                elif id == 4629687:  # High Activity by Transactions
-                    await prisma.highactivitywalletsbytransactions.create(
-                        data=row
-                    )
-                elif id == 4629509:  # Most Profitable Wallets
-                    await prisma.mostprofitablewallets.create(
-                        data=row
-                    )
-                elif id == 4683382:  # Most Profitable Wallets
-                    await prisma.mostprofitablewalletstx.create(
-                        data=row
-                    )
-                elif id == 4656172:  # Token Deployer Success
-                    row['created_at'] = datetime.strptime(row['created_at'].split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    row['token_launch_time'] = datetime.strptime(row['token_launch_time'].split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    
-                    await prisma.tokendeployersuccess.create(
-                        data=row
-                    )
-
-        await scrape_kolscan()
-        await scrape_gmgn()
-
+        await refresh_data(full_reload)
         return {'status': 'success', 'message': 'Data updated successfully'}, 200
     except Exception as e:
         return {'status': 'error', 'message': str(e)}, 500
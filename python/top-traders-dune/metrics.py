@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from quart import g, request, Response
+import time
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'API request latency', ['method', 'route', 'status']
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Database query duration', ['operation', 'table']
+)
+DUNE_EXECUTION_DURATION = Histogram(
+    'dune_execution_duration_seconds', 'Dune API call duration, per attempt', ['call'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+DUNE_RETRY_BACKOFF = Histogram(
+    'dune_retry_backoff_seconds', 'Time slept before retrying a failed Dune call', ['call'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60)
+)
+DUNE_QUEUE_WAIT = Histogram(
+    'dune_queue_wait_seconds', 'Time a Dune request waited for a worker', ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+DUNE_QUEUE_DEPTH = Gauge('dune_request_queue_depth', 'Dune requests waiting for a worker')
+ROWS_INGESTED = Counter('rows_ingested_total', 'Rows written by ingests', ['table'])
+SCRAPER_DURATION = Histogram(
+    'scraper_duration_seconds', 'Scraper run duration', ['scraper'],
+    buckets=(10, 30, 60, 120, 300, 600, 1200)
+)
+
+@contextmanager
+def observe_db(operation, table):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_DURATION.labels(operation, table).observe(time.perf_counter() - start)
+
+def init_metrics(app):
+    @app.before_request
+    async def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    async def observe_request_latency(response):
+        start = g.get('request_start')
+        if start is not None:
+            # The route pattern rather than the path keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.perf_counter() - start)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,94 @@
+from quart import current_app, jsonify, request, Response
+import base64
+import json
+from metrics import observe_db
+
+MAX_PAGE_LIMIT = 1000
+STREAM_PAGE_SIZE = 500
+
+def encode_cursor(value, id):
+    return base64.urlsafe_b64encode(json.dumps([value, id]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    value, id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return value, int(id)
+
+def parse_page_args():
+    # Raises ValueError on a malformed limit or cursor
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        limit = min(limit, MAX_PAGE_LIMIT)
+    if cursor is not None:
+        try:
+            cursor = decode_cursor(cursor)
+        except Exception as e:
+            raise ValueError('invalid cursor') from e
+    return limit, cursor
+
+def keyset_where(where, order_field, cursor):
+    # Rows after the cursor in (order_field DESC, id DESC) order
+    if cursor is None:
+        return where
+    value, id = cursor
+    return {
+        **where,
+        'OR': [
+            {order_field: {'lt': value}},
+            {order_field: value, 'id': {'lt': id}}
+        ]
+    }
+
+async def fetch_page(model, where, order_field, limit=None, cursor=None):
+    with observe_db('find_many', type(model).__name__.removesuffix('Actions').lower()):
+        return await model.find_many(
+            where=keyset_where(where, order_field, cursor),
+            order=[{order_field: 'desc'}, {'id': 'desc'}],
+            take=limit
+        )
+
+def next_cursor(rows, order_field, limit):
+    if not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, order_field), last.id)
+
+async def stream_rows(model, where, order_field, format_row, key, dumps, limit=None, cursor=None, meta=None):
+    # Writes rows as they are read, one keyset page at a time; meta fields follow the rows.
+    # The body is sent after the view returns, outside the app context, so dumps is bound by the caller
+    yield f'{{"{key}": ['.encode('utf-8')
+    sent = 0
+    first = True
+    while limit is None or sent < limit:
+        page_size = STREAM_PAGE_SIZE if limit is None else min(STREAM_PAGE_SIZE, limit - sent)
+        rows = await fetch_page(model, where, order_field, page_size, cursor)
+        for row in rows:
+            yield ((b'' if first else b',') + dumps(format_row(row)).encode('utf-8'))
+            first = False
+        sent += len(rows)
+        if len(rows) < page_size:
+            break
+        cursor = (getattr(rows[-1], order_field), rows[-1].id)
+    yield b']' + (b',' + dumps(meta).encode('utf-8')[1:-1] if meta else b'') + b'}'
+
+async def list_response(model, where, order_field, format_row, key='wallets', meta=None):
+    # limit/cursor page through rows by (order_field, id); stream=1 streams them instead
+    try:
+        limit, cursor = parse_page_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+
+    if request.args.get('stream') == '1':
+        return Response(
+            stream_rows(model, where, order_field, format_row, key, current_app.json.dumps, limit, cursor, meta),
+            mimetype='application/json'
+        )
+
+    rows = await fetch_page(model, where, order_field, limit, cursor)
+    body = {key: [format_row(row) for row in rows], **(meta or {})}
+    if limit:
+        body['next_cursor'] = next_cursor(rows, order_field, limit)
+    return jsonify(body)
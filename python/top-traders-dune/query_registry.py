@@ -0,0 +1,30 @@
+import yaml
+
+QUERY_MODES = ('swap', 'upsert')
+
+class DuneQuery:
+    def __init__(self, id, table, transform, unique_key, mode='swap', refresh_minutes=360, max_age_hours=24):
+        if mode not in QUERY_MODES:
+            raise ValueError(f"Query {id}: mode must be one of {', '.join(QUERY_MODES)}")
+        self.id = id
+        self.table = table
+        self.transform = transform
+        self.unique_key = list(unique_key)
+        self.mode = mode
+        self.refresh_minutes = refresh_minutes
+        self.max_age_hours = max_age_hours
+
+def load_query_registry(path, transforms):
+    # transforms maps the transform names used in the file to row conversion functions
+    with open(path, 'r', encoding='utf-8') as file:
+        data = yaml.safe_load(file)
+
+    queries = {}
+    for entry in data['queries']:
+        entry = dict(entry)
+        transform = entry.pop('transform')
+        if transform not in transforms:
+            raise ValueError(f"Query {entry['id']}: unknown transform '{transform}'")
+        query = DuneQuery(transform=transforms[transform], **entry)
+        queries[query.id] = query
+    return queries, data.get('scrapers', {})
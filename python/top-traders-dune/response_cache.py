@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from functools import wraps
+from quart import request, make_response, Response
+from quart.wrappers.response import DataBody
+import os
+import time
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 6 * 60 * 60))  # seconds, backstop for invalidation
+
+class ResponseCache:
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, body), least recently used first
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key, body, generation):
+        # Drop responses computed from data that was replaced while the view ran
+        if generation != self.generation or len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def invalidate(self):
+        self.entries.clear()
+        self.size = 0
+        self.generation += 1
+
+    def _remove(self, key):
+        _, body = self.entries.pop(key)
+        self.size -= len(body)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+def cached_response(cache):
+    # Caches the serialized JSON body of successful responses, keyed by route and query args
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            body = cache.get(key)
+            if body is not None:
+                return Response(body, mimetype='application/json', headers={'X-Cache': 'HIT'})
+
+            generation = cache.generation
+            response = await make_response(await view(*args, **kwargs))
+            # Streamed bodies are left alone; buffering them would defeat the stream
+            if response.status_code == 200 and isinstance(response.response, DataBody):
+                cache.set(key, await response.get_data(), generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
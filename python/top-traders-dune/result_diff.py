@@ -0,0 +1,71 @@
+from prisma import Json
+import hashlib
+import json
+import logging
+from bulk_upsert import bulk_transaction, build_upsert_select_query, delete_chunks
+from metrics import ROWS_INGESTED, observe_db
+
+logger = logging.getLogger(__name__)
+
+def row_key(row, unique_keys):
+    return json.dumps([row[k] for k in unique_keys], default=str)
+
+def hash_row(row):
+    encoded = json.dumps(row, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+def hash_rows(rows, unique_keys):
+    return {row_key(row, unique_keys): hash_row(row) for row in rows}
+
+def content_hash(row_hashes):
+    digest = hashlib.sha256()
+    for key in sorted(row_hashes):
+        digest.update(f'{key}={row_hashes[key]}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+def changed_rows(rows, unique_keys, row_hashes, previous_hashes):
+    # Rows that are new or differ from the previous result
+    changed = []
+    for row in rows:
+        key = row_key(row, unique_keys)
+        if previous_hashes.get(key) != row_hashes[key]:
+            changed.append(row)
+    return changed
+
+def deleted_keys(row_hashes, previous_hashes):
+    # Unique key values of rows that disappeared since the previous result
+    return [json.loads(key) for key in previous_hashes if key not in row_hashes]
+
+async def get_query_state(db, query_id):
+    return await db.dunequerystate.find_unique(where={'query_id': query_id})
+
+async def save_query_state(db, query_id, execution_id, result_hash, row_hashes):
+    state = {
+        'execution_id': execution_id,
+        'content_hash': result_hash,
+        'row_hashes': Json(row_hashes),
+    }
+    await db.dunequerystate.upsert(
+        where={'query_id': query_id},
+        data={
+            'create': {'query_id': query_id, **state},
+            'update': state
+        }
+    )
+
+async def save_execution_id(db, query_id, execution_id):
+    await db.dunequerystate.update(where={'query_id': query_id}, data={'execution_id': execution_id})
+
+async def apply_result_diff(db, query_id, table, diff_table, columns, unique_keys, changed_count, deleted,
+                            execution_id, result_hash, row_hashes):
+    # The changed rows collected in diff_table, the deletions and the new state commit
+    # together, so a failed ingest leaves both the table and the stored hashes as they were
+    with observe_db('apply_diff', table):
+        async with bulk_transaction(db) as tx:
+            if changed_count:
+                await tx.execute_raw(build_upsert_select_query(table, diff_table, columns, unique_keys))
+            if deleted:
+                await delete_chunks(tx, table, deleted, unique_keys)
+            await save_query_state(tx, query_id, execution_id, result_hash, row_hashes)
+    ROWS_INGESTED.labels(table).inc(changed_count)
+    logger.info(f"Applied diff to {table}: {changed_count} rows upserted, {len(deleted)} deleted")
@@ -0,0 +1,191 @@
+from datetime import datetime
+import logging
+import pandas as pd
+
+DUNE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+LEADERBOARD_DATETIME_FIELDS = ('last_trade_time', 'created_at', 'token_launch_time')
+
+logger = logging.getLogger(__name__)
+
+# Per-row conversions, kept as the reference for the columnar versions below
+
+def process_first_buy_wallet_row(row):
+    # Helper function to safely convert to float
+    def safe_float(value):
+        if value is None:
+            return 0.0
+        return float(value)
+    
+    # Helper function to safely parse datetime
+    def safe_datetime(value):
+        if value is None:
+            return datetime.now()
+        return datetime.strptime(value.split('.')[0], '%Y-%m-%d %H:%M:%S')
+    
+    return {
+        'token_mint_address': row['token_mint_address'],
+        'symbol': row['symbol'],
+        'token_launch_time': safe_datetime(row['token_launch_time']),
+        'trader_id': row['trader_id'],
+        'block_time': safe_datetime(row['block_time']),
+        'amount_usd': safe_float(row['amount_usd']),
+        'buyer_rank': int(row['buyer_rank']) if row['buyer_rank'] is not None else 0,
+        'buy_volume_1d': safe_float(row['buy_volume_1d']),
+        'sell_volume_1d': safe_float(row['sell_volume_1d']),
+        'total_pnl_1d': safe_float(row['total_pnl_1d']),
+        'total_trades_1d': safe_float(row['total_trades_1d']),
+        'buy_volume_7d': safe_float(row['buy_volume_7d']),
+        'sell_volume_7d': safe_float(row['sell_volume_7d']),
+        'total_pnl_7d': safe_float(row['total_pnl_7d']),
+        'total_trades_7d': safe_float(row['total_trades_7d']),
+        'buy_volume_30d': safe_float(row['buy_volume_30d']),
+        'sell_volume_30d': safe_float(row['sell_volume_30d']),
+        'total_pnl_30d': safe_float(row['total_pnl_30d']),
+        'total_trades_30d': safe_float(row['total_trades_30d']),
+        'shortest_hold_time': safe_float(row['shortest_hold_time']),
+        'longest_hold_time': safe_float(row['longest_hold_time']),
+        'average_hold_time': safe_float(row['average_hold_time']),
+        'shortest_hold_token': row['shortest_hold_token'],
+        'shortest_hold_symbol': row.get('shortest_hold_symbol', '') or '',
+        'longest_hold_token': row['longest_hold_token'],
+        'longest_hold_symbol': row.get('longest_hold_symbol', '') or '',
+        'last_updated': datetime.now().timestamp()
+    }
+
+def process_token_profitable_row(row, token_mint_address):
+    return {
+        'token_mint_address': token_mint_address,
+        'trader_id': row['trader_id'],
+        'total_profit': float(row['total_profit']),
+        'total_buy_usd': float(row['total_buy_usd']),
+        'total_sell_usd': float(row['total_sell_usd']),
+        'total_trades': int(row['total_trades']),
+        'total_wins': int(row['total_wins']),
+        'total_losses': int(row['total_losses']),
+        'win_rate': float(row['win_rate']),
+        'avg_profit_per_trade': float(row['avg_profit_per_trade']),
+        'pnl_ratio': float(row['pnl_ratio']),
+        'last_updated': datetime.now().timestamp()
+    }
+
+def process_holding_times_row(row):
+    return {
+        'trader_id': row['trader_id'],
+        'shortest_hold_time': float(row['shortest_hold_time']),
+        'longest_hold_time': float(row['longest_hold_time']),
+        'average_hold_time': float(row['average_hold_time']),
+        'shortest_hold_token': row['shortest_hold_token'],
+        'shortest_hold_symbol': row.get('shortest_hold_symbol', '') or '',
+        'longest_hold_token': row['longest_hold_token'],
+        'longest_hold_symbol': row.get('longest_hold_symbol', '') or '',
+        'last_updated': datetime.now().timestamp()
+    }
+
+def parse_dune_datetime(value):
+    return datetime.strptime(value.split('.')[0], '%Y-%m-%d %H:%M:%S')
+
+def process_leaderboard_row(row):
+    for field in LEADERBOARD_DATETIME_FIELDS:
+        if field in row:
+            row[field] = parse_dune_datetime(row[field])
+    return row
+
+# Columnar conversions parse a whole result page at once. They pay off for results with
+# timestamp columns; for all-numeric rows the per-row float() casts are already cheaper
+# than moving the rows in and out of a DataFrame (see bench_row_conversion.py)
+
+FIRST_BUY_COLUMNS = {
+    'token_mint_address': 'str',
+    'symbol': 'str',
+    'token_launch_time': 'datetime',
+    'trader_id': 'str',
+    'block_time': 'datetime',
+    'amount_usd': 'float',
+    'buyer_rank': 'int',
+    'buy_volume_1d': 'float',
+    'sell_volume_1d': 'float',
+    'total_pnl_1d': 'float',
+    'total_trades_1d': 'float',
+    'buy_volume_7d': 'float',
+    'sell_volume_7d': 'float',
+    'total_pnl_7d': 'float',
+    'total_trades_7d': 'float',
+    'buy_volume_30d': 'float',
+    'sell_volume_30d': 'float',
+    'total_pnl_30d': 'float',
+    'total_trades_30d': 'float',
+    'shortest_hold_time': 'float',
+    'longest_hold_time': 'float',
+    'average_hold_time': 'float',
+    'shortest_hold_token': 'str',
+    'shortest_hold_symbol': 'optional_str',
+    'longest_hold_token': 'str',
+    'longest_hold_symbol': 'optional_str',
+}
+
+def str_column(series):
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def optional_str_column(series):
+    return series.astype(object).where(series.notna() & (series != ''), '').tolist()
+
+def float_column(series):
+    return pd.to_numeric(series, errors='coerce').fillna(0.0).astype('float64').tolist()
+
+def int_column(series):
+    return pd.to_numeric(series, errors='coerce').fillna(0).astype('int64').tolist()
+
+def datetime_column(series, default=None):
+    # Dune timestamps look like '2024-01-01 12:00:00.000 UTC'; the first 19 characters
+    # are parsed in one pass. Missing values become `default` when one is given, like the
+    # first buy rows' per-row code; anything else that does not parse becomes None
+    missing = series.isna()
+    text = series.astype(object).where(~missing, None).astype('string').str.slice(0, 19)
+    parsed = pd.to_datetime(text, format=DUNE_DATETIME_FORMAT, errors='coerce')
+    if default is not None:
+        parsed = parsed.where(~missing, pd.Timestamp(default))
+    return pd.Series(parsed.dt.to_pydatetime(), dtype=object).where(parsed.notna(), None).tolist()
+
+def first_buy_datetime_column(series):
+    return datetime_column(series, datetime.now())
+
+CONVERTERS = {
+    'str': str_column,
+    'optional_str': optional_str_column,
+    'float': float_column,
+    'int': int_column,
+    'datetime': first_buy_datetime_column,
+}
+
+def drop_invalid_timestamps(rows, fields):
+    # The timestamp columns are NOT NULL, so rows the per-row code would have failed on are
+    # logged and left out instead of being given an invented time
+    valid = [row for row in rows if all(row.get(field) is not None for field in fields if field in row)]
+    if len(valid) < len(rows):
+        logger.warning(f"Dropped {len(rows) - len(valid)} of {len(rows)} rows with a missing or unparseable {'/'.join(fields)}")
+    return valid
+
+def convert_columns(rows, spec, constants=None):
+    if not rows:
+        return []
+    frame = pd.DataFrame.from_records(rows, columns=list(spec))
+    columns = {name: CONVERTERS[kind](frame[name]) for name, kind in spec.items()}
+    for name, value in (constants or {}).items():
+        columns[name] = [value] * len(frame)
+    names = list(columns)
+    converted = [dict(zip(names, values)) for values in zip(*columns.values())]
+    return drop_invalid_timestamps(converted, [name for name, kind in spec.items() if kind == 'datetime'])
+
+def convert_first_buy_wallet_rows(rows):
+    return convert_columns(rows, FIRST_BUY_COLUMNS, {'last_updated': datetime.now().timestamp()})
+
+def convert_leaderboard_rows(rows):
+    # Leaderboard rows keep Dune's columns; only the timestamp columns are parsed
+    if not rows:
+        return rows
+    for field in LEADERBOARD_DATETIME_FIELDS:
+        if field in rows[0]:
+            values = datetime_column(pd.Series([row.get(field) for row in rows], dtype=object))
+            for row, value in zip(rows, values):
+                row[field] = value
+    return drop_invalid_timestamps(rows, LEADERBOARD_DATETIME_FIELDS)
@@ -0,0 +1,60 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+
+SCRAPER_PROCESSES = int(os.getenv('SCRAPER_PROCESSES', 2))
+SCRAPER_TIMEOUT = int(os.getenv('SCRAPER_TIMEOUT', 1800))  # seconds
+
+logger = logging.getLogger(__name__)
+scraper_slots = None
+
+def run_scraper(name):
+    from kolscan_scraper import scrape_kolscan
+    from gmgn_scraper import scrape_gmgn
+
+    scrapers = {
+        'kolscan': scrape_kolscan,
+        'gmgn': scrape_gmgn,
+    }
+    return asyncio.run(scrapers[name](save=False))
+
+async def scrape_in_subprocess(name):
+    # Selenium's blocking waits run in a separate process, so they never stall the API's
+    # event loop. With save=False the scraper only returns its records; the caller writes them.
+    global scraper_slots
+    if scraper_slots is None:
+        scraper_slots = asyncio.Semaphore(SCRAPER_PROCESSES)
+
+    async with scraper_slots:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), name,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), SCRAPER_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Kill the whole process group so Chrome and chromedriver go too, then reap the
+            # worker before giving the slot back
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                raise RuntimeError(f"Scraper {name} timed out after {SCRAPER_TIMEOUT}s") from e
+            raise
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Scraper {name} exited with code {process.returncode}")
+    return json.loads(stdout)
+
+if __name__ == "__main__":
+    # Worker entry point: python scraper_worker.py <kolscan|gmgn>
+    # Records are written to stdout as JSON; anything the scraper prints goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        records = run_scraper(sys.argv[1])
+    json.dump(records, sys.stdout)
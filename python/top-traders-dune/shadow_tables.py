@@ -0,0 +1,37 @@
+import logging
+from bulk_upsert import bulk_upsert
+
+STAGING_SUFFIX = '_staging'
+DIFF_SUFFIX = '_diff'
+OLD_SUFFIX = '_old'
+
+logger = logging.getLogger(__name__)
+
+async def create_staging_table(db, table, suffix=STAGING_SUFFIX):
+    staging = f'{table}{suffix}'
+    await db.execute_raw(f"DROP TABLE IF EXISTS `{staging}`")
+    await db.execute_raw(f"CREATE TABLE `{staging}` LIKE `{table}`")
+    return staging
+
+async def drop_staging_table(db, table, suffix=STAGING_SUFFIX):
+    await db.execute_raw(f"DROP TABLE IF EXISTS `{table}{suffix}`")
+
+async def load_staging_table(db, table, rows, unique_keys):
+    staging = await create_staging_table(db, table)
+    return await bulk_upsert(db, staging, rows, unique_keys)
+
+async def publish_staging_tables(db, tables):
+    if not tables:
+        return
+
+    old_tables = ', '.join(f'`{t}{OLD_SUFFIX}`' for t in tables)
+    await db.execute_raw(f"DROP TABLE IF EXISTS {old_tables}")
+
+    # A multi-table RENAME is atomic, so readers see either the old or the new
+    # contents of every table and never an empty one
+    renames = ', '.join(
+        f'`{t}` TO `{t}{OLD_SUFFIX}`, `{t}{STAGING_SUFFIX}` TO `{t}`' for t in tables
+    )
+    await db.execute_raw(f"RENAME TABLE {renames}")
+    await db.execute_raw(f"DROP TABLE {old_tables}")
+    logger.info(f"Published staging tables: {', '.join(tables)}")
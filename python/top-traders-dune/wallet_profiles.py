@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+import time
+
+WALLET_PROFILE_TABLE = 'wallet_profile'
+TOP_TRADERS_TABLE = os.getenv('TOP_TRADERS_TABLE', 'top_traders')  # written by the dexscreener service
+PROFILE_CHUNK_SIZE = int(os.getenv('PROFILE_CHUNK_SIZE', 1000))  # wallets per incremental rebuild statement
+
+logger = logging.getLogger(__name__)
+
+# source table -> (profile column, address column, fields copied into the profile)
+PROFILE_SOURCES = {
+    'most_profitable_wallets': ('most_profitable', 'trader_id', [
+        'period', 'total_profit', 'total_buy_usd', 'total_sell_usd', 'total_trades',
+        'total_wins', 'total_losses', 'win_rate', 'pnl_ratio',
+    ]),
+    'most_profitable_wallets_tx': ('most_profitable_tx', 'trader_id', [
+        'period', 'total_transaction_count', 'total_profit', 'total_buy_usd', 'total_sell_usd',
+        'total_trades', 'total_wins', 'total_losses', 'win_rate', 'avg_profit_per_trade',
+        'total_volume_bought', 'total_volume_sold', 'total_volume_traded', 'pnl_ratio', 'last_trade_time',
+    ]),
+    'high_activity_wallets_by_volume': ('high_volume', 'trader_id', [
+        'days', 'total_volume_usd', 'total_trades', 'avg_trade_size_usd', 'last_trade_time',
+    ]),
+    'high_activity_wallets_by_transactions': ('high_transactions', 'trader_id', [
+        'days', 'total_transactions', 'avg_daily_transactions', 'total_volume_usd',
+        'avg_trade_size_usd', 'last_trade_time',
+    ]),
+    'kol_leaderboard': ('kol_leaderboard', 'wallet_address', [
+        'period', 'wallet_name', 'win', 'loss', 'pnl_usd', 'pnl_sol', 'telegram', 'twitter',
+    ]),
+    'gmgn_kol': ('gmgn_kol', 'wallet_address', [
+        'period', 'wallet_name', 'win', 'loss', 'pnl_percentage', 'pnl_usd', 'telegram', 'twitter',
+    ]),
+    'TokenHoldingTimes': ('holding_times', 'trader_id', [
+        'shortest_hold_time', 'longest_hold_time', 'average_hold_time', 'shortest_hold_token',
+        'shortest_hold_symbol', 'longest_hold_token', 'longest_hold_symbol', 'last_updated',
+    ]),
+    TOP_TRADERS_TABLE: ('top_traders', 'wallet', [
+        'tokenAddress', 'period', 'rank', 'boughtAmount', 'boughtVolume', 'soldAmount',
+        'soldVolume', 'pnl', 'unrealized', 'balance', 'transactions',
+    ]),
+}
+PROFILE_COLUMNS = [column for column, _, _ in PROFILE_SOURCES.values()]
+
+# Rebuilds of different sections touch overlapping wallet_profile rows, so running them
+# concurrently can deadlock in InnoDB; they take turns instead
+profile_lock = asyncio.Lock()
+
+async def table_exists(db, table):
+    rows = await db.query_raw(
+        "SELECT COUNT(*) AS n FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = ?",
+        table
+    )
+    return bool(rows and rows[0]['n'])
+
+async def refresh_wallet_profiles(db, table, addresses=None):
+    # Rebuilds one source's section of wallet_profile inside MySQL. With addresses only
+    # those wallets are recomputed; without, the whole section is. Either way wallets
+    # that dropped out of the source lose it.
+    column, address_column, fields = PROFILE_SOURCES[table]
+    if addresses is not None and not addresses:
+        return
+    if table == TOP_TRADERS_TABLE and not await table_exists(db, table):
+        return
+
+    async with profile_lock:
+        start = time.perf_counter()
+        if addresses is None:
+            await rebuild_section(db, table, column, address_column, fields)
+        else:
+            addresses = list(addresses)
+            for i in range(0, len(addresses), PROFILE_CHUNK_SIZE):
+                await rebuild_section(db, table, column, address_column, fields, addresses[i:i + PROFILE_CHUNK_SIZE])
+        scope = 'all wallets' if addresses is None else f'{len(addresses)} wallets'
+        logger.info(f"Refreshed wallet profile section {column} from {table} for {scope} in {time.perf_counter() - start:.2f}s")
+
+async def rebuild_section(db, table, column, address_column, fields, addresses=None):
+    entries = ', '.join(f"'{f}', `{f}`" for f in fields)
+    where = ''
+    scope = ''
+    args = []
+    if addresses is not None:
+        placeholders = ', '.join(['?'] * len(addresses))
+        where = f"WHERE `{address_column}` IN ({placeholders})"
+        scope = f"AND `address` IN ({placeholders})"
+        args = list(addresses)
+    await db.execute_raw(
+        f"INSERT INTO `{WALLET_PROFILE_TABLE}` (`address`, `{column}`, `updatedAt`) "
+        f"SELECT `{address_column}`, JSON_ARRAYAGG(JSON_OBJECT({entries})), UTC_TIMESTAMP(3) "
+        f"FROM `{table}` {where} GROUP BY `{address_column}` "
+        f"ON DUPLICATE KEY UPDATE `{column}` = VALUES(`{column}`), `updatedAt` = VALUES(`updatedAt`)",
+        *args
+    )
+
+    await db.execute_raw(
+        f"UPDATE `{WALLET_PROFILE_TABLE}` SET `{column}` = NULL, `updatedAt` = UTC_TIMESTAMP(3) "
+        f"WHERE `{column}` IS NOT NULL {scope} "
+        f"AND `address` NOT IN (SELECT `{address_column}` FROM `{table}` {where})",
+        *args, *args
+    )
+    empty = ' AND '.join(f'`{c}` IS NULL' for c in PROFILE_COLUMNS)
+    await db.execute_raw(f"DELETE FROM `{WALLET_PROFILE_TABLE}` WHERE {empty} {scope}", *args)
+
+async def ensure_wallet_profiles(db):
+    # Backfills sections that are empty while their source has rows, e.g. holding times
+    # fetched before profiles existed, which are otherwise only rebuilt per wallet as
+    # they are fetched again
+    for table, (column, _, _) in PROFILE_SOURCES.items():
+        if table == TOP_TRADERS_TABLE and not await table_exists(db, table):
+            continue
+        rows = await db.query_raw(
+            f"SELECT EXISTS(SELECT 1 FROM `{table}`) AS has_source, "
+            f"EXISTS(SELECT 1 FROM `{WALLET_PROFILE_TABLE}` WHERE `{column}` IS NOT NULL) AS has_section"
+        )
+        if rows[0]['has_source'] and not rows[0]['has_section']:
+            await refresh_wallet_profiles(db, table)